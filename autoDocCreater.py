@@ -1,32 +1,161 @@
+import collections
+import csv
+import hashlib
+import io
+import itertools
+import json
 import os
+import pickle
+import posixpath
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 import pandas as pd
 import docx
 from docx.shared import Pt, RGBColor, Inches
+from docx.enum.style import WD_STYLE_TYPE
 from docx.enum.table import WD_ALIGN_VERTICAL, WD_TABLE_ALIGNMENT
 from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_UNDERLINE
-from docx.oxml import OxmlElement
+from docx.oxml import OxmlElement, parse_xml
 from docx.oxml.ns import qn
+from docx.parts.image import ImagePart
+from lxml import etree
+from build_manifest import BuildManifest
+from doc_template import QCDocTemplate
+from row_schema import COLUMN_OF, DOCUMENT_COLUMNS, IMAGE_FIELDS, RowSchema, SchemaError
+from image_registry import ImageRegistry
+from dir_index import DirectoryIndex
+from move_journal import MoveJournal
+from instrumentation import Instrumentation
+from docx_archive import DocArchiveWriter
+from docx_compact import compact_document, save_compact
+from folder_watch import FolderWatch
 
 # import gdrive_utils as gu
 
+# output CSV of create_documents_drive, next to the sheet
+LINKS_SUFFIX = '.links.csv'
+LINKS_COLUMNS = ('ID', 'filename', 'file_id', 'link')
+
+# part of every build fingerprint: bump it when the document layout or formatting changes,
+# so that documents built by an older version are rebuilt (2: runs formatted through named QC styles)
+DOC_LAYOUT_VERSION = 2
+
+# parsed sheets of csv_cache=True: a local folder of this user, never the shared sheet folder (the cache is unpickled)
+CSV_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'tidc_auto_doc')
+
+# generators registered in a worker process of the document pool, keyed by CSV path
+_WORKER_GENERATORS = {}
+
+def _init_worker(*generators):
+    """ Process-pool initializer: keep one copy of each generator (sheet) per worker """
+    for generator in generators:
+        generator.inst.take() # a forked worker inherits the parent's measurements: report only its own
+        _WORKER_GENERATORS[generator.csv] = generator
+
+def _build_row_task(task):
+    """ Process-pool task: build the document of one CSV row """
+    csv, position, in_memory = task
+    generator = _WORKER_GENERATORS[csv]
+    result = generator._build_row(generator.records[position], in_memory=in_memory)
+    result['timings'] = generator.inst.take() # merged into the parent's instrumentation with the result
+    return result
+
+def _pool_results(executor, tasks, window, ordered=False):
+    """
+    Yield (task, result) of _build_row_task as the pool finishes them (in task order if
+    `ordered`), with at most `window` tasks submitted and not yet consumed: executor.map
+    would queue every task up front, and its results would pile up behind a slow consumer
+    """
+    tasks = iter(tasks)
+    pending, queue = {}, collections.deque() # queue: submission order, kept if `ordered`
+    def submit(count):
+        for task in itertools.islice(tasks, count):
+            future = executor.submit(_build_row_task, task)
+            pending[future] = task
+            if ordered: queue.append(future)
+    submit(window)
+    while pending:
+        if ordered:
+            done = [queue.popleft()]
+        else:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            yield pending.pop(future), future.result()
+        submit(len(done))
+
+class _RowContext:
+    """ Per-row state of a board: CERN ID, target folder, docx name and document """
+    def __init__(self, base, row):
+        self.cernID = row.cern_id
+        self.folder = os.path.join(base, self.cernID)
+        self.gdoc = row.doc_name + '.docx'
+        # 1st step: crreate doc at the base directory
+        # 2nd step: move the doc to the target folder
+        # this 2-step treatment will allow to copy links from Google Drive to excel
+        # (create_documents_drive uploads in one step and writes the links to <csv>.links.csv instead)
+        self.output_file = os.path.join(base, self.gdoc)
+        self.doc = None
+        self.placeholders = False # True while compiling the document template
+
 class QualityControlDocGenerator:
-    def __init__(self, target_folder, filename, drive='My Drive', prefix='/content/drive/'):
+    # stages of run_pipeline, in processing order
+    PIPELINE_STAGES = ('directories', 'photos', 'documents', 'docx')
+
+    # resident size of a document pool worker (interpreter, pandas, python-docx, one open document), used with memory_budget
+    WORKER_BYTES = 200 * 1024**2
+
+    # columns read by the document builders (see row_schema.FIELDS)
+    DOCUMENT_COLUMNS = DOCUMENT_COLUMNS
+
+    # named styles added to every document by _add_styles
+    TITLE_STYLE = 'QC Title'
+    LABEL_STYLE = 'QC Label'
+    BLANK_STYLE = 'QC Blank'
+    VALUE_STYLE = 'QC Value'
+    PLAIN_VALUE_STYLE = 'QC Value Plain'
+
+    # class attributes: an RGBColor instance attribute would not unpickle in spawned pool workers
+    black = RGBColor(0, 0, 0)
+    blue = RGBColor(0, 0, 255)
+
+    def __init__(self, target_folder, filename, drive='My Drive', prefix='/content/drive/', engine='builder', image_cache=None,
+                 csv_columns='all', csv_chunksize=None, csv_cache=False, mode='verbose', instrumentation=None,
+                 image_registry=None, directory_index=None, memory_budget=None, io_workers=1, compact_level=None):
         self.drive = drive
         prefix = os.path.join(prefix, drive)
         self.prefix = prefix if prefix.endswith('/') else prefix + '/' # 確保 prefix 結尾有斜線
+        self.target_folder = target_folder
         self.base = os.path.join(self.prefix, target_folder)
         self.filename = filename
         self.csv = os.path.join(self.base, filename)
-        self.doc = None
-        self.black = RGBColor(0, 0, 0)
-        self.blue = RGBColor(0, 0, 255)
+        self.manifest_path = os.path.splitext(self.csv)[0] + '.manifest.jsonl'
+        self.links_path = os.path.splitext(self.csv)[0] + LINKS_SUFFIX # Drive IDs and links of uploaded documents
+        self.journal = MoveJournal(os.path.splitext(self.csv)[0] + '.moves.jsonl')
+        self.csv_columns = csv_columns # 'all', or 'used': only the columns read by the document builders
+        self.csv_chunksize = csv_chunksize # stream the CSV this many rows at a time: records only, no full DataFrame (nor csv_cache)
+        self.csv_cache = self._csv_cache_path(csv_cache) if csv_cache else None # True: CSV_CACHE_DIR, or a folder
+        self._style_ids, self._style_xml = {}, [] # named styles, filled by the first _add_styles
+        self.engine = engine # 'builder': build every docx run by run, 'template': fill a compiled layout
+        self._template = None
+        self.image_cache = image_cache # ImageCache: embed photos downsampled to their print size
+        self.image_registry = image_registry or ImageRegistry() # images shared by several documents are read once per run (may be shared by sheets)
+        self.inst = instrumentation or Instrumentation(mode) # 'quiet', 'summary' or 'verbose' reporting
+        if image_cache is not None and image_cache.inst is None:
+            image_cache.inst = self.inst
+        # bytes: stream the sheet, release every document's images once saved, size the pool to fit
+        self.memory_budget = memory_budget
+        self.io_workers = io_workers # threads for the folder and move stages: their cost is file-system latency, not CPU
+        self.compact_level = compact_level # None: python-docx's save, 0-9: compact docx with XML deflated at this level
+        if memory_budget:
+            self.image_registry.max_bytes = min(self.image_registry.max_bytes, memory_budget // 8)
 
-        print(f">>> {self.base}")
-        print(f">>> {self.csv}")
+        self.inst.log(f">>> {self.base}")
+        self.inst.log(f">>> {self.csv}")
 
         # Check & Read the CSV
-        self._check_folder()
-        self.df = self._read_and_process_csv()
+        self._check_folder(directory_index)
+        with self.inst.span('csv_load'):
+            self.df, self.schema, self.records = self._load_sheet()
 
         # Find the Glue column
         # self.glue_column = self._find_column_by_keyword('Glue')
@@ -35,130 +164,714 @@ class QualityControlDocGenerator:
     #----------------------------------------------------------------------------------------------------
     # main methods
     #----------------------------------------------------------------------------------------------------
-    def create_directories(self):
-        """ Create folders based on CERN ID """
-        print("[INFO] 建立資料夾：")
-        for index, row in self.df.iterrows():
-            sub_folder = os.path.join(self.base, row['ID'])
-            os.makedirs(sub_folder, exist_ok=True)
-            print(f"A folder has been created: {sub_folder}")
-        print("")
-
-    def move_photos(self):
-        """ Move photos to sub-directories (CERN ID) """
-        print("[INFO] 移動相片：")
-        for index, row in self.df.iterrows():
-            self.cernID = row['ID']
-            self.folder = os.path.join(self.base, row['ID'])
-            os.makedirs(self.folder, exist_ok=True)
-
-            flag, _ = self._find_path(link=row['image link'], verbosity=True)
-            if flag==1: self._move_file(self.base, self.folder, row['image link'])
-
-            flag, _ = self._find_path(link=row['p2_image link'], verbosity=True)
-            if flag==1: self._move_file(self.base, self.folder, row['p2_image link'])
-
-    def move_back_photos(self):
+    def create_directories(self, workers=None):
+        """ Create folders based on CERN ID; returns one {'ID', 'error'} per row """
+        self.inst.info("[INFO] 建立資料夾：")
+        results = self._run_io('directories', workers)
+        self.inst.log("")
+        return results
+
+    def move_photos(self, workers=None):
+        """ Move photos to sub-directories (CERN ID); returns one {'ID', 'error'} per row """
+        self.inst.info("[INFO] 移動相片：")
+        self.journal.begin('photos')
+        results = self._run_io('photos', workers)
+        self.journal.commit()
+        return results
+
+    def move_back_photos(self, workers=8):
         """ Move back photos to sub-directories (CERN ID) """
-        print("[INFO] 還原相片位置：")
-        for index, row in self.df.iterrows():
-            self.folder = os.path.join(self.base, row['ID'])
-            os.makedirs(self.folder, exist_ok=True)
-
-            flag, _ = self._find_path(row['image link'])
-            if flag==2: self._move_file(self.folder, self.base, row['image link'])
-
-            flag, _ = self._find_path(row['p2_image link'])
-            if flag==2: self._move_file(self.folder, self.base, row['p2_image link'])
-
-    def create_documents(self):
-        """ Create documents """
-        print("[INFO] 建立docx文件：")
-        for index, row in self.df.iterrows():
-            self._create_quality_control_doc(row)
-
-    def move_docx(self):
-        print("[INFO] 移動docx文件：")
-        for index, row in self.df.iterrows():
-            self.cernID = row['ID']
-            self.folder = os.path.join(self.base, row['ID'])
-            os.makedirs(self.folder, exist_ok=True)
-
-            self.gdoc = row['filename+ID'] + '.docx'
-            flag, _ = self._find_path(link=self.gdoc, verbosity=True)
-            if flag==1: self._move_file(self.base, self.folder, self.gdoc)
+        self.inst.info("[INFO] 還原相片位置：")
+        if self.journal.pending(tag='photo'):
+            return self.rollback_moves(tag='photo', workers=workers)
+
+        # no journal of the photo moves (e.g. moved by an older version): probe every link
+        self.journal.begin('restore')
+        for row in self.records:
+            ctx = _RowContext(self.base, row)
+            self._make_folder(ctx.folder)
+
+            flag, _ = self._find_path(ctx, row.image_link)
+            if flag==2: self._move_file(ctx.folder, self.base, row.image_link)
+
+            flag, _ = self._find_path(ctx, row.p2_image_link)
+            if flag==2: self._move_file(ctx.folder, self.base, row.p2_image_link)
+        self.journal.commit()
+
+    def create_documents(self, workers=1, force=False, output='files', shard_size=None):
+        """
+        Create documents
+
+        Returns one result per row in CSV order: {'ID', 'output', 'error', 'skipped'}.
+        Boards whose inputs did not change since their last build (see BuildManifest)
+        are skipped unless force=True. With workers > 1 the rows are spread across a process pool.
+        output='archive' writes every document into zip archives instead (see create_documents_archive),
+        output='drive' uploads them to their Drive folders (see create_documents_drive).
+        """
+        if output == 'archive':
+            return self.create_documents_archive(workers, shard_size)
+        if output == 'drive':
+            return self.create_documents_drive(workers)
+        if output != 'files':
+            raise ValueError(f"Unknown output mode: {output!r}")
+
+        self.inst.info("[INFO] 建立docx文件：")
+        self.index.sync()
+        workers = self._cap_workers(workers)
+        if workers > 1:
+            return self.create_documents_parallel(workers, force)
+
+        manifest = BuildManifest(self.manifest_path)
+        results = []
+        for row in self.records:
+            results.append(self._build_if_changed(_RowContext(self.base, row), row, manifest, force))
+            self.inst.progress(len(results), len(self.records))
+        manifest.compact()
+        self._print_image_stats()
+        self._print_build_summary(results)
+        self.inst.summary()
+        return results
+
+    def create_documents_parallel(self, workers=None, force=False):
+        """ Create documents on a process pool (workers=None: one per CPU) """
+        manifest = BuildManifest(self.manifest_path)
+        results, tasks, fingerprints = self._plan_documents(manifest, force)
+
+        nworkers = self._cap_workers(workers or os.cpu_count() or 1)
+        with self.inst.span('process_pool', workers=nworkers, tasks=len(tasks)), \
+             ProcessPoolExecutor(max_workers=nworkers, initializer=_init_worker, initargs=(self,)) as executor:
+            for done, (task, result) in enumerate(_pool_results(executor, tasks, 2 * nworkers)):
+                self._collect_document(task, result, results, manifest, fingerprints)
+                self.inst.progress(done + 1, len(tasks))
+
+        manifest.compact()
+        self._print_build_summary(results)
+        self.inst.summary()
+        return results
+
+    def create_documents_archive(self, workers=1, shard_size=None, name=None):
+        """
+        Create documents straight into zip archives in self.base, laid out as <CERN ID>/<filename+ID>.docx
+
+        One archive (<name>.zip), or one per `shard_size` documents (<name>-0001.zip, ...),
+        plus <name>.index.json mapping each member to its board. Documents never touch
+        the filesystem one by one, and every board is built: the archives are rewritten,
+        and shards of an earlier run beyond the new ones are deleted.
+        Results carry '<archive>:<member>' as output.
+        """
+        self.inst.info("[INFO] 建立docx封存檔：")
+        name = name or os.path.splitext(self.filename)[0] + '_docx'
+        results = []
+        with DocArchiveWriter(self.base, name, shard_size) as archive:
+            for row, result in self._build_in_memory(workers):
+                results.append(self._archive_result(archive, row, result))
+                self.inst.progress(len(results), len(self.records))
+
+        for archive_name in sorted({entry['archive'] for entry in archive.index.values()}):
+            self.index.add(self.base, archive_name)
+        self.index.add(self.base, os.path.basename(archive.index_path))
+        for archive_name in archive.removed:
+            self.index.discard(self.base, archive_name)
+        self.inst.info(f"[INFO] {len(archive.index)} documents archived, index: {archive.index_path}")
+        self._print_build_summary(results)
+        self.inst.summary()
+        return results
+
+    def create_documents_drive(self, workers=1, shared_drive=None, upload_workers=4, links=None, mover=None):
+        """
+        Upload the documents from memory straight into <target_folder>/<CERN ID> on a shared drive
+
+        Nothing is saved in self.base and moved afterwards: each document is built in memory
+        (on a process pool if workers > 1) and handed to concurrent resumable uploads as soon
+        as it is ready. The pool builds only as fast as the uploads take the documents: at
+        most 2 x workers built and 2 x upload_workers uploading ones are held. `shared_drive` defaults to the last component of the drive path and
+        `mover` to the session's safe_move.SharedDriveMover. The file ID and link of every
+        uploaded board are merged into `links` (default <csv>.links.csv), keyed by ID.
+        Results carry the link as output.
+        """
+        import gdrive_utils as gu
+
+        self.inst.info("[INFO] 上傳docx文件：")
+        shared_drive = shared_drive or os.path.basename(os.path.normpath(self.drive))
+        folder = self.target_folder.replace(os.sep, '/') # path inside the shared drive
+        results, uploading = [], []
+
+        def documents():
+            for row, result in self._build_in_memory(workers):
+                results.append(result)
+                self.inst.progress(len(results), len(self.records))
+                blob = result.pop('blob', None)
+                if blob is not None:
+                    uploading.append((row, result))
+                    yield posixpath.join(folder, row.cern_id), row.doc_name + '.docx', blob
+
+        with self.inst.span('drive_upload'):
+            uploads = gu.upload_files(shared_drive, documents(), mover=mover, max_workers=upload_workers)
+
+        entries = []
+        for (row, result), upload in zip(uploading, uploads):
+            if upload['ok']:
+                result['output'] = upload['link']
+                entries.append({'ID': row.cern_id, 'filename': upload['name'], 'file_id': upload['id'], 'link': upload['link']})
+            else:
+                result['error'] = f"upload: {upload['error']}"
+                self._print_error(f"document not uploaded for {row.cern_id}: {upload['error']}")
+        self.inst.count('uploads', len(entries))
+
+        links = links or self.links_path
+        self._write_links(links, entries)
+        self.inst.info(f"[INFO] {len(entries)} documents uploaded to {shared_drive}, links: {links}")
+        self._print_build_summary(results)
+        self.inst.summary()
+        return results
+
+    def _build_in_memory(self, workers):
+        """
+        Yield (row, result with the docx bytes in 'blob') in sheet order, on a process pool if workers > 1
+
+        The pool builds at most 2 x workers documents ahead of the consumer.
+        """
+        self.index.sync()
+        rows = self.records
+        workers = self._cap_workers(workers)
+        if workers > 1:
+            tasks = ((self.csv, position, True) for position in range(len(rows)))
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+                for (_, position, _), result in _pool_results(executor, tasks, 2 * workers, ordered=True):
+                    self.inst.merge(result.pop('timings', None))
+                    yield rows[position], result
+        else:
+            for row in rows:
+                yield row, self._build_row(row, in_memory=True)
+
+    def _write_links(self, path, entries):
+        """ Merge {'ID', 'filename', 'file_id', 'link'} entries into the links CSV; boards not uploaded this time are kept """
+        merged = {}
+        if os.path.exists(path):
+            with open(path, newline='', encoding='utf-8') as f:
+                merged = {entry['ID']: entry for entry in csv.DictReader(f)}
+        for entry in entries:
+            merged[entry['ID']] = entry
+
+        tmp = path + '.tmp'
+        with open(tmp, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=LINKS_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(merged.values())
+        os.replace(tmp, path)
+
+    def _plan_documents(self, manifest, force):
+        """ Check every row against the manifest; returns (results with the skipped rows filled, pool tasks, fingerprints) """
+        results = [None] * len(self.records)
+        tasks, fingerprints = [], {}
+        for position, row in enumerate(self.records):
+            ctx = _RowContext(self.base, row)
+            fingerprint, skipped = self._check_manifest(ctx, row, manifest, force)
+            if skipped:
+                results[position] = skipped
+            else:
+                tasks.append((self.csv, position, False))
+                fingerprints[position] = (ctx.gdoc, fingerprint)
+        return results, tasks, fingerprints
+
+    def _collect_document(self, task, result, results, manifest, fingerprints):
+        """ Record the result of a pool task built by another process """
+        _, position, _ = task
+        self.inst.merge(result.pop('timings', None))
+        results[position] = result
+        if result['error'] is None:
+            manifest.record(*fingerprints[position])
+            # the workers updated their own copies of the directory index
+            self.index.add(self.base, os.path.basename(result['output']))
+
+    def _archive_result(self, archive, row, result):
+        blob = result.pop('blob', None)
+        if blob is not None:
+            ctx = _RowContext(self.base, row)
+            result['output'] = archive.add(ctx.cernID, ctx.gdoc, blob)
+        return result
+
+    def move_docx(self, workers=None):
+        """ Move documents to sub-directories (CERN ID); returns one {'ID', 'error'} per row """
+        self.inst.info("[INFO] 移動docx文件：")
+        self.journal.begin('docx')
+        results = self._run_io('docx', workers)
+        self.journal.commit()
+        return results
+
+    def rollback_moves(self, batches=None, tag=None, workers=8):
+        """
+        Undo journaled moves in reverse order without rescanning the folders
+
+        `batches` and `tag` ('photo' or 'docx') restrict what is undone; by default
+        every move not undone yet. Returns one {'src', 'dst', 'ok', 'error'} per move.
+        """
+        with self.inst.span('rollback'):
+            results = self.journal.rollback(batches, tag, workers)
+        self.inst.count('moves_undone', sum(1 for result in results if result['ok']))
+        for result in results:
+            if result['ok']:
+                name = os.path.basename(result['src'])
+                self.index.move(os.path.dirname(result['dst']), os.path.dirname(result['src']), name)
+                self.inst.log(f"- moved file from {result['dst']} to {result['src']}")
+            else:
+                self._print_error(f"cannot move back {result['dst']}: {result['error']}")
+        return results
+
+    def run_pipeline(self, stages=PIPELINE_STAGES, force=False):
+        """
+        Process each board once, from directory creation to the docx move
+
+        `stages` picks a subset of PIPELINE_STAGES; they always run in pipeline order.
+        Unchanged documents are skipped as in create_documents unless force=True.
+        Returns {'results': one {'ID', 'output', 'error'} per row, 'timings': seconds per stage}.
+        """
+        stages = self._pipeline_stages(stages)
+        self.inst.info(f"[INFO] pipeline: {' → '.join(stages)}")
+        results, timings = self._run_rows(self.records, stages, force)
+        self.inst.info("[INFO] pipeline timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+        self.inst.summary()
+        return {'results': results, 'timings': timings}
+
+    def watch(self, interval=2.0, debounce=5.0, stages=PIPELINE_STAGES, max_cycles=None):
+        """
+        Keep the documents up to date while photos are uploaded and the sheet is re-exported
+
+        Polls stat snapshots of self.base and its CERN-ID folders every `interval` seconds.
+        Once changes have settled for `debounce` seconds they are mapped to rows: a new
+        CSV marks the rows whose values changed, a photo the rows linking to it. Only
+        those rows go through `stages` again (unchanged documents are still skipped).
+        Runs until interrupted, or for `max_cycles` rebuild cycles; returns
+        one {'changes', 'IDs', 'results'} per cycle.
+        """
+        stages = self._pipeline_stages(stages)
+        tracker = FolderWatch(self.base, debounce)
+        self.inst.info(f"[INFO] watching {self.base} every {interval}s (Ctrl-C to stop)")
+        cycles = []
+        try:
+            while max_cycles is None or len(cycles) < max_cycles:
+                time.sleep(interval)
+                tracker.poll()
+                if not tracker.ready():
+                    continue
+
+                changes = tracker.take()
+                rows = self._affected_rows(changes)
+                self.inst.info(f"[INFO] {len(changes)} changed files -> {len(rows)} boards "
+                               + " ".join(row.cern_id for row in rows))
+                results = []
+                if rows:
+                    with self.inst.span('watch_cycle', changes=len(changes), rows=len(rows)):
+                        results, _ = self._run_rows(rows, stages, force=False, batch='watch')
+                    # the photos moved by this cycle are not new changes
+                    tracker.rebaseline(ignore={getattr(row, name) for row in rows for name in IMAGE_FIELDS})
+                cycles.append({'changes': sorted(changes), 'IDs': [row.cern_id for row in rows], 'results': results})
+        except KeyboardInterrupt:
+            self.inst.info("[INFO] watch stopped")
+        return cycles
+
+    def _pipeline_stages(self, stages):
+        unknown = set(stages) - set(self.PIPELINE_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {sorted(unknown)}")
+        return [stage for stage in self.PIPELINE_STAGES if stage in stages]
+
+    def _run_rows(self, rows, stages, force, batch='pipeline'):
+        """ Run the stages board by board over `rows`; returns (results, seconds per stage) """
+        self.index.sync()
+        manifest = BuildManifest(self.manifest_path) if 'documents' in stages else None
+        self.journal.begin(batch)
+        timings = dict.fromkeys(stages, 0.0)
+        results = []
+        for row in rows:
+            ctx = _RowContext(self.base, row)
+            result = {'ID': ctx.cernID, 'output': None, 'error': None, 'skipped': False}
+            for stage in stages:
+                start = time.perf_counter()
+                try:
+                    self._run_stage(stage, ctx, row, result, manifest, force)
+                except Exception as e:
+                    result['error'] = f"{stage}: {type(e).__name__}: {e}"
+                    self._print_error(f"{ctx.cernID} stopped at {result['error']}")
+                finally:
+                    timings[stage] += time.perf_counter() - start
+                if result['error']: break
+            results.append(result)
+            self.inst.progress(len(results), len(rows))
+        self.journal.commit()
+
+        if manifest is not None:
+            manifest.compact()
+            self._print_build_summary(results)
+        return results, timings
+
+    def _affected_rows(self, changes):
+        """ Rows touched by changed paths ('name' or '<CERN ID>/name'), in sheet order """
+        positions = set()
+        if self.filename in changes:
+            positions |= self._reload_records()
+
+        links = {} # linked file name -> row positions
+        for position, row in enumerate(self.records):
+            for name in IMAGE_FIELDS:
+                link = getattr(row, name)
+                if link: links.setdefault(link, set()).add(position)
+
+        for path in changes:
+            folder, name = os.path.split(path)
+            # external changes: keep the directory index in step with the disk
+            directory = os.path.join(self.base, folder)
+            if os.path.exists(os.path.join(directory, name)):
+                self.index.add(directory, name)
+            else:
+                self.index.discard(directory, name)
+            self.image_registry.discard(os.path.join(directory, name)) # a photo replaced under its name is read again
+            positions |= links.get(name, set()) | links.get(path, set())
+        return [self.records[position] for position in sorted(positions)]
+
+    def _reload_records(self):
+        """ Re-read the CSV; returns the positions of new or changed rows (all kept as before if unreadable) """
+        df, schema, records = self._load_sheet()
+        if schema is None:
+            return set()
+        previous = {row.cern_id: row.values() for row in self.records}
+        self.df, self.schema, self.records = df, schema, records
+        return {position for position, row in enumerate(records) if previous.get(row.cern_id) != row.values()}
 
     #----------------------------------------------------------------------------------------------------
     # auxiliary modules
     #----------------------------------------------------------------------------------------------------
-    def _move_file(self, old, new, f):
+    def _move_file(self, old, new, f, tag=None):
         path1 = os.path.join(old, f)
         path2 = os.path.join(new, f)
-        os.rename(path1, path2)
-        print(f"- moved file from {path1} to {path2}")
+        self.journal.record(path1, path2, tag) # logged first: a crash mid-move stays recoverable
+        with self.inst.span('move', trace=False):
+            os.rename(path1, path2)
+        self.index.move(old, new, f)
+        self.inst.count('moves')
+        self.inst.log(f"- moved file from {path1} to {path2}")
         # gu.move_file(self.drive, path1, path2)
 
-    def _create_quality_control_doc(self, row):
-        self.cernID = row['ID']
-        self.folder = os.path.join(self.base, self.cernID) 
-        self.gdoc = row['filename+ID'] + '.docx'
+    def _run_io(self, stage, workers=None):
+        """
+        Run a file-system stage ('directories', 'photos' or 'docx') over every row
 
-        # 1st step: crreate doc at the base directory
-        # 2nd step: move the doc to the target folder
-        # this 2-step treatment will allow to copy links from Google Drive to excel
-        self.output_file = os.path.join(self.base, self.gdoc) 
-
-        self.doc = docx.Document()
-        self._set_page_margins()
-        self._add_title(row, 'title page1', 'ID')
-        self._add_first_visual_inspection(row)
-        self.doc.add_page_break()
-        self._add_title(row, 'title page2', 'p2_ID')
-        self._add_second_visual_inspection(row)
-        self.doc.save(self.output_file)
-        print(f"Document has been saved as {self.output_file}")
+        Rows are spread over `workers` threads (default: io_workers); each board creates
+        its folder before moving anything into it. Rows sharing a source file (a photo
+        linked by two boards, a repeated document name) run one after the other in CSV
+        order, as they would serially, instead of racing to move it. A failing board does
+        not stop the others: returns one {'ID', 'error'} per row in CSV order.
+        """
+        workers = workers or self.io_workers
+        self.index.sync() # files uploaded or moved by others since the index was read
+
+        def run(position):
+            ctx = _RowContext(self.base, self.records[position])
+            result = {'ID': ctx.cernID, 'error': None}
+            try:
+                self._run_stage(stage, ctx, self.records[position], result, None, False)
+            except Exception as e:
+                result['error'] = f"{stage}: {type(e).__name__}: {e}"
+            return result
+
+        def run_chain(chain):
+            return [(position, run(position)) for position in chain]
+
+        results, done = [None] * len(self.records), 0
+        with self.inst.span(f"io_{stage}", workers=workers, rows=len(self.records)):
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for finished in executor.map(run_chain, self._io_chains(stage)):
+                        for position, result in finished:
+                            results[position] = result
+                        done += len(finished)
+                        self.inst.progress(done, len(self.records))
+            else:
+                for position in range(len(self.records)):
+                    results[position] = run(position)
+                    self.inst.progress(position + 1, len(self.records))
+
+        for result in results:
+            if result['error']:
+                self._print_error(f"{result['ID']} {result['error']}")
+        return results
+
+    def _io_chains(self, stage):
+        """ Row positions of a file-system stage, grouped so that rows sharing a source file share a group (in CSV order) """
+        parent = list(range(len(self.records))) # union-find over the rows
+        def root(position):
+            while parent[position] != position:
+                parent[position] = parent[parent[position]]
+                position = parent[position]
+            return position
+
+        owner = {} # source file -> first row moving it
+        for position, row in enumerate(self.records):
+            if stage == 'photos':
+                sources = [link for link in (row.image_link, row.p2_image_link) if link and link.strip()]
+            elif stage == 'docx':
+                sources = [row.doc_name + '.docx']
+            else:
+                sources = []
+            for source in sources:
+                if source in owner:
+                    parent[root(position)] = root(owner[source])
+                else:
+                    owner[source] = position
+
+        chains = {}
+        for position in range(len(self.records)):
+            chains.setdefault(root(position), []).append(position)
+        return list(chains.values())
+
+    def _run_stage(self, stage, ctx, row, result, manifest, force):
+        if stage == 'directories':
+            self._make_folder(ctx.folder)
+            self.inst.log(f"A folder has been created: {ctx.folder}")
+        elif stage == 'photos':
+            self._make_folder(ctx.folder)
+            self._move_row_photos(ctx, row)
+        elif stage == 'documents':
+            result.update(self._build_if_changed(ctx, row, manifest, force))
+        elif stage == 'docx':
+            self._make_folder(ctx.folder)
+            self._move_row_docx(ctx)
+
+    def _move_row_photos(self, ctx, row):
+        flag, _ = self._find_path(ctx, link=row.image_link, verbosity=True)
+        if flag==1: self._move_file(self.base, ctx.folder, row.image_link, tag='photo')
+
+        flag, _ = self._find_path(ctx, link=row.p2_image_link, verbosity=True)
+        if flag==1: self._move_file(self.base, ctx.folder, row.p2_image_link, tag='photo')
+
+    def _move_row_docx(self, ctx):
+        flag, _ = self._find_path(ctx, link=ctx.gdoc, verbosity=True)
+        if flag==1: self._move_file(self.base, ctx.folder, ctx.gdoc, tag='docx')
+
+    def _build_if_changed(self, ctx, row, manifest, force):
+        fingerprint, skipped = self._check_manifest(ctx, row, manifest, force)
+        if skipped:
+            return skipped
+        result = self._build_row(row, ctx)
+        if result['error'] is None:
+            manifest.record(ctx.gdoc, fingerprint)
+        return result
+
+    def _check_manifest(self, ctx, row, manifest, force):
+        """ Return the row's fingerprint, plus a 'skipped' result if its document is up to date """
+        fingerprint = self._fingerprint(ctx, row)
+        if force or not manifest.is_current(ctx.gdoc, fingerprint):
+            return fingerprint, None
+        flag, path = self._find_path(ctx, ctx.gdoc)
+        if path is None:
+            return fingerprint, None
+        return fingerprint, {'ID': ctx.cernID, 'output': path, 'error': None, 'skipped': True}
+
+    def _fingerprint(self, ctx, row):
+        """ Inputs of a board's document: the row fields used by the builders and its images' size/mtime """
+        values = json.dumps(row.values(), ensure_ascii=False)
+        images = {}
+        for name in IMAGE_FIELDS:
+            _, path = self._find_path(ctx, getattr(row, name))
+            column = COLUMN_OF[name] # keyed by header: manifests of earlier runs stay valid
+            if path is None:
+                images[column] = None
+            else:
+                stat = os.stat(path)
+                images[column] = [stat.st_size, stat.st_mtime_ns]
+        options = [f"layout-{DOC_LAYOUT_VERSION}"]
+        if self.image_cache:
+            options += [self.image_cache.dpi, self.image_cache.quality]
+        if self.compact_level is not None:
+            options.append(f"compact-{self.compact_level}")
+        return {'row': hashlib.sha1(values.encode('utf-8')).hexdigest(), 'images': images, 'options': options}
+
+    def _build_row(self, row, ctx=None, in_memory=False):
+        """ Build the document of one row, collecting the error instead of raising """
+        result = {'ID': row.cern_id, 'output': None, 'error': None, 'skipped': False}
+        try:
+            ctx = ctx or _RowContext(self.base, row)
+            if in_memory: # the docx bytes are returned in result['blob']
+                stream = io.BytesIO()
+                self._create_quality_control_doc(row, ctx, stream)
+                result['blob'] = stream.getvalue()
+            else:
+                self._create_quality_control_doc(row, ctx)
+                result['output'] = ctx.output_file
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+            self._print_error(f"document not created for {result['ID']}: {result['error']}")
+        return result
+
+    def _release_document(self, ctx):
+        """ Drop a saved document and the image bytes its parts hold, without waiting for the cyclic GC """
+        for part in ctx.doc.part.package.iter_parts():
+            if isinstance(part, ImagePart):
+                part._blob = None
+                part._image = None
+        ctx.doc = None
+
+    def _cap_workers(self, workers):
+        """ Pool size that fits the memory budget: WORKER_BYTES, the image registry and two of the largest photos per worker """
+        if not self.memory_budget or workers <= 1:
+            return workers
+        largest = 0
+        for row in self.records:
+            for name in IMAGE_FIELDS:
+                _, path = self._find_path(_RowContext(self.base, row), getattr(row, name))
+                if path is not None:
+                    largest = max(largest, os.path.getsize(path))
+        per_worker = self.WORKER_BYTES + self.image_registry.max_bytes + 2 * largest
+        allowed = max(1, self.memory_budget // per_worker)
+        if allowed < workers:
+            self.inst.info(f"[INFO] memory budget {self.memory_budget / 1024**2:.0f} MiB: {allowed} workers instead of {workers}")
+        return min(workers, allowed)
+
+    def _make_folder(self, folder):
+        if not self.index.has_folder(folder):
+            os.makedirs(folder, exist_ok=True)
+            self.index.add_folder(folder)
+
+    def _create_quality_control_doc(self, row, ctx=None, stream=None):
+        ctx = ctx or _RowContext(self.base, row)
+        with self.inst.span('doc_build', ID=ctx.cernID):
+            if self.engine == 'template':
+                ctx.doc = self._get_template().render(ctx, row)
+            else:
+                ctx.doc = docx.Document()
+                self._build_document(ctx, row)
+        if self.compact_level is None:
+            with self.inst.span('doc_save', ID=ctx.cernID):
+                ctx.doc.save(stream or ctx.output_file)
+        else:
+            with self.inst.span('doc_compact', ID=ctx.cernID):
+                compact_document(ctx.doc)
+            with self.inst.span('doc_save', ID=ctx.cernID):
+                save_compact(ctx.doc, stream or ctx.output_file, self.compact_level)
+        if self.memory_budget:
+            self._release_document(ctx)
+        self.inst.count('documents')
+        if stream is None:
+            self.index.add(self.base, ctx.gdoc)
+            self.inst.log(f"Document has been saved as {ctx.output_file}")
 
     #----------------------------------------------------------------------------------------------------
     # Load-data related
     #----------------------------------------------------------------------------------------------------
-    def _check_folder(self): # TODO: return error if folder/csv does not exist
+    def _check_folder(self, directory_index=None): # TODO: return error if folder/csv does not exist
         # 確保目標資料夾存在
         if not os.path.exists(self.base):
             os.makedirs(self.base)
-            print(f'新增 {self.base}')
+            self.inst.info(f'新增 {self.base}')
 
-        # List all files in the directory
-        files = os.listdir(self.base)
-        for f in files:
-            full_path = os.path.join(self.base, f)
-            file_size = os.path.getsize(full_path)
-            # print(f"- {f} ({file_size} bytes)")
+        # Index all files in the directory and its sub-folders (one scandir pass), unless another sheet of the folder did
+        if directory_index is not None and os.path.normpath(directory_index.base) == os.path.normpath(self.base):
+            self.index = directory_index
+        else:
+            self.index = DirectoryIndex(self.base)
 
         # Check for specific file
-        if os.path.exists(self.csv):
-            print(f"[INFO] Found target file: {self.filename}")
-            print(f"Full path: {self.csv}")
-            print(f"File size: {os.path.getsize(self.csv)} bytes")
-            print("")
+        if self.index.locate(self.filename, [self.base]) is not None:
+            self.inst.info(f"[INFO] Found target file: {self.filename}")
+            self.inst.log(f"Full path: {self.csv}")
+            self.inst.log(f"File size: {os.path.getsize(self.csv)} bytes")
+            self.inst.log("")
         else:
-            print(f"\n[ERROR] Target file does not exist: {self.filename}")
+            self._print_error(f"Target file does not exist: {self.filename}")
+
+    def _load_sheet(self):
+        """ Read the CSV; returns (DataFrame, RowSchema, QCRecords), or (None, None, []) if it cannot be used """
+        if self.memory_budget or self.csv_chunksize:
+            return self._stream_records()
+        df = self._read_and_process_csv()
+        schema, records = self._load_records(df)
+        return (df, schema, records) if schema is not None else (None, None, [])
+
+    def _stream_records(self):
+        """ Bounded-memory load: records built chunk by chunk; only the header of the DataFrame is kept """
+        header, schema, records = None, None, []
+        try:
+            for chunk in self.iter_csv_chunks():
+                if schema is None:
+                    header = chunk.iloc[:0]
+                    schema, _ = self._load_records(header)
+                    if schema is None:
+                        return None, None, []
+                records += schema.records(chunk)
+        except Exception as e:
+            self._print_error(f"Error processing file: {str(e)}")
+            return None, None, []
+        return header, schema, records
 
     def _read_and_process_csv(self):
         """
         Read and process the CSV file to extract relevant information
         """
         try:
-            # Skip the first two rows and use the third row as headers
-            df = pd.read_csv(self.csv, skiprows=2, header=0, dtype=str) # 刪除前兩行
-            df = df.dropna(subset=['User'])  # 刪除 User 欄位為空的列
-            df = df.fillna('') # replace all NaN with empty strings
-            df.columns = [str(col).strip().replace('\n', ' ') for col in df.columns]
+            stat = os.stat(self.csv)
+            cache_key = (stat.st_size, stat.st_mtime_ns, self.csv_columns)
+            df = self._load_csv_cache(cache_key)
+            if df is not None:
+                return df
+
+            df = self._process_chunk(pd.read_csv(self.csv, skiprows=2, header=0, dtype=str, usecols=self._usecols()))
             # self._inspect_contents(df)
+            self._save_csv_cache(cache_key, df)
             return df
 
         except Exception as e:
-            print(f"Error processing file: {str(e)}")
+            self._print_error(f"Error processing file: {str(e)}")
+            return None
+
+    def iter_csv_chunks(self, chunksize=None):
+        """ Stream the processed CSV `chunksize` rows at a time, keeping memory flat for large sheets """
+        # Skip the first two rows and use the third row as headers
+        reader = pd.read_csv(self.csv, skiprows=2, header=0, dtype=str, usecols=self._usecols(),
+                             chunksize=chunksize or self.csv_chunksize or 1000) # 刪除前兩行
+        with reader:
+            for chunk in reader:
+                yield self._process_chunk(chunk)
+
+    def _process_chunk(self, df):
+        df = df.dropna(subset=['User'])  # 刪除 User 欄位為空的列
+        df = df.fillna('') # replace all NaN with empty strings
+        df.columns = [self._normalize_header(col) for col in df.columns]
+        return df
+
+    def _normalize_header(self, col):
+        return str(col).strip().replace('\n', ' ')
+
+    def _usecols(self):
+        if self.csv_columns == 'all':
+            return None
+        used = set(self.DOCUMENT_COLUMNS) | {'User'}
+        return lambda col: self._normalize_header(col) in used
+
+    def _csv_cache_path(self, cache_dir):
+        """ Cache file of this sheet, named after its absolute path so that sheets of the same name do not collide """
+        if cache_dir is True:
+            cache_dir = CSV_CACHE_DIR
+        key = hashlib.sha1(os.path.abspath(self.csv).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(cache_dir, f"{os.path.splitext(self.filename)[0]}-{key}.parsed.pkl")
+
+    def _load_csv_cache(self, key):
+        if self.csv_cache is None or not os.path.exists(self.csv_cache):
+            return None
+        try:
+            with open(self.csv_cache, 'rb') as f:
+                cached = pickle.load(f)
+        except Exception: # unreadable cache: parse the CSV again
             return None
+        return cached['df'] if cached.get('key') == key else None
+
+    def _save_csv_cache(self, key, df):
+        if self.csv_cache is None:
+            return
+        os.makedirs(os.path.dirname(self.csv_cache), mode=0o700, exist_ok=True)
+        tmp = self.csv_cache + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump({'key': key, 'df': df}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.csv_cache)
 
     def _inspect_contents(self, df):
         # Print the column names to verify
@@ -171,71 +884,134 @@ class QualityControlDocGenerator:
         print("\nFirst few rows of data (selected columns):")
         print(df[keywords].head())
 
+    def _load_records(self, df):
+        """ Resolve the builder fields against the CSV headers once and convert the rows to QCRecords """
+        if df is None:
+            return None, []
+        try:
+            schema = RowSchema(df.columns)
+        except SchemaError as e:
+            self._print_error(f"Error processing file: {e}")
+            return None, []
+        if schema.missing:
+            self._print_error(f"columns missing from {self.filename}, left blank in the documents: {', '.join(schema.missing)}")
+        return schema, schema.records(df)
+
     def _find_column_by_keyword(self, keyword):
         """
         Find column name that contains the given keyword
         """
-        matching_cols = [col for col in self.df.columns if keyword.lower() in col.lower()]
-        return matching_cols[0] if matching_cols else None
+        return self.schema.find_column(keyword) if self.schema else None
 
     #----------------------------------------------------------------------------------------------------
     # Document-related
     #----------------------------------------------------------------------------------------------------
-    def _set_page_margins(self):
-        for section in self.doc.sections:
+    def _build_document(self, ctx, row):
+        self._add_styles(ctx.doc)
+        self._set_page_margins(ctx)
+        self._add_title(ctx, row, row.title_page1, row.cern_id)
+        self._add_first_visual_inspection(ctx, row)
+        ctx.doc.add_page_break()
+        self._add_title(ctx, row, row.title_page2, row.p2_id)
+        self._add_second_visual_inspection(ctx, row)
+
+    def _get_template(self):
+        """ Compile the QC layout once per generator (and once per pool worker) """
+        if self._template is None:
+            self._template = QCDocTemplate(self, _RowContext)
+        return self._template
+
+    def _set_page_margins(self, ctx):
+        for section in ctx.doc.sections:
             section.top_margin = Inches(1)
             section.bottom_margin = Inches(1)
             section.left_margin = Inches(1)
             section.right_margin = Inches(1)
 
+    def _add_styles(self, doc):
+        """ Named styles of the QC layout; runs refer to them instead of carrying their own formatting """
+        if self._style_xml: # defined once per generator, then copied into every new document
+            for xml in self._style_xml:
+                doc.styles.element.append(parse_xml(xml))
+            return
+
+        styles = doc.styles
+        title = styles.add_style(self.TITLE_STYLE, WD_STYLE_TYPE.PARAGRAPH)
+        title.base_style = styles['Normal']
+        title.font.size = Pt(14)
+        title.font.bold = True
+        title.paragraph_format.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        added = [title]
+
+        for name, color, underline in [
+            (self.LABEL_STYLE       , self.black , None)               ,
+            (self.BLANK_STYLE       , self.black , WD_UNDERLINE.THICK) ,
+            (self.VALUE_STYLE       , self.blue  , WD_UNDERLINE.THICK) ,
+            (self.PLAIN_VALUE_STYLE , self.blue  , None)               ,
+        ]:
+            style = styles.add_style(name, WD_STYLE_TYPE.CHARACTER)
+            style.font.color.rgb = color
+            if underline is not None:
+                style.font.underline = underline
+            added.append(style)
+
+        self._style_ids = {style.name: style.style_id for style in added}
+        self._style_xml = [etree.tostring(style.element) for style in added] # bytes: the generator goes to pool workers
+
+    def _add_styled_run(self, paragraph, text, style, color=None):
+        """ Run in a named style; the rStyle is built directly, python-docx would look the style up for every run """
+        run = paragraph.add_run(text)
+        properties = OxmlElement('w:rPr')
+        properties.append(OxmlElement('w:rStyle', {qn('w:val'): self._style_ids[style]}))
+        run._r.insert(0, properties)
+        if color is not None:
+            run.font.color.rgb = color
+        return run
+
     def _add_underlined_spaces(self, paragraph, Nspaces, color=None):
+        if Nspaces <= 0: # an empty run shows nothing
+            return
         full_width_underscore = '＿'
-        underlined_spaces = paragraph.add_run(full_width_underscore * Nspaces)
-        underlined_spaces.font.color.rgb = color or self.black
-        underlined_spaces.font.underline = WD_UNDERLINE.THICK
+        self._add_styled_run(paragraph, full_width_underscore * Nspaces, self.BLANK_STYLE, color)
 
     def _add_empty_spaces(self, paragraph, Nspaces=4, color=None):
         space = ' '
-        underlined_spaces = paragraph.add_run(space * Nspaces)
-        underlined_spaces.font.color.rgb = color or self.black
+        self._add_styled_run(paragraph, space * Nspaces, self.LABEL_STYLE, color)
 
-    def _add_title(self, row, titleKey, idKey):
-        title = self.doc.add_paragraph(str(row[titleKey]))
-        title.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        title_format = title.runs[0].font
-        title_format.size = Pt(14)
-        title_format.bold = True
+    def _add_title(self, ctx, row, titleText, idText):
+        title = ctx.doc.add_paragraph(titleText)
+        title._p.style = self._style_ids[self.TITLE_STYLE]
 
         info = [
-            ("User:"         , row['User']         if pd.notna(row['User'])         else "") ,
-            ("Date:"         , row['Date']         if pd.notna(row['Date'])         else "") ,
-            ("Version:"      , row['Version']      if pd.notna(row['Version'])      else "") ,
-            ("Manufacturer:" , row['Manufacturer'] if pd.notna(row['Manufacturer']) else "") ,
-            ("Batch:"        , row['Batch number'] if pd.notna(row['Batch number']) else "") ,
-            ("ID:"           , row[idKey]          if pd.notna(row[idKey])          else "")
+            ("User:"         , row.user)         ,
+            ("Date:"         , row.date)         ,
+            ("Version:"      , row.version)      ,
+            ("Manufacturer:" , row.manufacturer) ,
+            ("Batch:"        , row.batch)        ,
+            ("ID:"           , idText)
         ]
 
         for i, (key, value) in enumerate(info):
             if i % 3 == 0:
-                p = self.doc.add_paragraph()
+                p = ctx.doc.add_paragraph()
 
-            run = p.add_run(key)
-            run.font.color.rgb = self.black
+            self._add_styled_run(p, key, self.LABEL_STYLE)
             self._add_underlined_spaces(p, 2)
-
-            run = p.add_run(value)
-            run.font.underline = WD_UNDERLINE.THICK
-            run.font.color.rgb = self.blue
+            self._add_styled_run(p, value, self.VALUE_STYLE)
             self._add_underlined_spaces(p, 2)
 
-    def _process_image(self, p, image_link):
-        _, image_path = self._find_path(image_link)
+    def _process_image(self, ctx, p, image_link):
+        if ctx.placeholders: # keep a slot for the picture in the compiled template
+            p.add_run(image_link)
+            return
+
+        _, image_path = self._find_path(ctx, image_link)
         if image_path is not None:
             self._add_image(p, image_path)
 
-    def _add_formatted_table(self, row):
+    def _add_formatted_table(self, ctx, row):
         # 添加新的1x2表格
-        new_table = self.doc.add_table(rows=1, cols=2)
+        new_table = ctx.doc.add_table(rows=1, cols=2)
         new_table.style = 'Normal Table'
         new_table.alignment = WD_TABLE_ALIGNMENT.CENTER
 
@@ -247,112 +1023,123 @@ class QualityControlDocGenerator:
         for i, cell in enumerate(new_table.rows[0].cells):
             cell.vertical_alignment = WD_ALIGN_VERTICAL.CENTER
             if i==0:
-                paragraph = cell.add_paragraph()
-                paragraph.add_run(f"{row['p2_Chip ID']}")
+                cell.add_paragraph(row.p2_chip_id)
             elif i==1:
                 p = cell.add_paragraph()
-                self._process_image(p, row.get('p2_Chip location map link', ''))
+                self._process_image(ctx, p, row.p2_chip_map_link)
 
-    def _find_path(self, link, verbosity=False):
+    def _find_path(self, ctx, link, verbosity=False):
         if not link or not link.strip():
             return 0, None
 
-        potential_paths = [
-            os.path.join(self.base, link), # 1
-            os.path.join(self.folder, link) # 2
+        directories = [
+            self.base, # 1
+            ctx.folder # 2
         ]
 
-        for i, path in enumerate(potential_paths):
-            if os.path.exists(path):
-                return i+1, path
+        with self.inst.span('path_lookup', trace=False):
+            i = self.index.locate(link, directories)
+        if i is not None:
+            return i+1, os.path.join(directories[i], link)
 
         if verbosity:
-            self._print_error(f"{link} not found for {self.cernID}")
+            self._print_error(f"{link} not found for {ctx.cernID}")
         return 3, None
 
+    def _print_image_stats(self):
+        stats = self.image_registry.stats()
+        self.inst.info(f"[INFO] image registry: {stats['hits']} hits, {stats['misses']} misses, "
+                       f"{stats['images']} images ({stats['bytes']} bytes)")
+
+    def _print_build_summary(self, results):
+        skipped = sum(1 for result in results if result['skipped'])
+        failed = sum(1 for result in results if result['error'])
+        self.inst.info(f"[INFO] documents: {len(results) - skipped - failed} rebuilt, {skipped} skipped (unchanged), {failed} failed")
+
     def _print_error(self, message: str) -> None:
-        print(f"\033[91m[ERROR] {message}\033[0m")
+        self.inst.error(message)
 
     def _add_image(self, paragraph, image_path, default_width=3.5):
         paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
         run = paragraph.add_run()
-        run.add_picture(image_path, width=Inches(default_width))
-        print(f'+ adding picture: {image_path}')
+        with self.inst.span('image_embed', path=image_path):
+            embedded = self.image_cache.get(image_path, default_width) if self.image_cache else image_path
+            self.image_registry.add_picture(run, embedded, Inches(default_width))
+        self.inst.count('images')
+        self.inst.log(f'+ adding picture: {image_path}')
 
     def _add_customized_paragraph(self, paragraph, item, value, spaces):
         useEmptySpace = (spaces[0]==0) and (spaces[1]==0)
 
         paragraph.add_run(f"{item} ")
         self._add_underlined_spaces(paragraph, spaces[0])
-        run = paragraph.add_run(value)
-        if useEmptySpace is False: run.font.underline = WD_UNDERLINE.THICK
-        run.font.color.rgb = self.blue
+        self._add_styled_run(paragraph, value, self.PLAIN_VALUE_STYLE if useEmptySpace else self.VALUE_STYLE)
         self._add_underlined_spaces(paragraph, spaces[1])
         if useEmptySpace: self._add_empty_spaces(paragraph)
 
-    def _add_first_visual_inspection(self, row):
-        self.doc.add_heading("1st Visual Inspection – Bare PCB", level=1)
+    def _add_first_visual_inspection(self, ctx, row):
+        ctx.doc.add_heading("1st Visual Inspection – Bare PCB", level=1)
 
         inspection_items = [
-            ("General comments:"       , row['General comments']       , 2 , [34, 0, 42]),
-            ("Flatness:"               , row['Flatness']               , 1 , [2  , 2])  ,
-            ("Comments:"               , row['Comments']               , 0 , [25 , 0])  ,
-            ("Thickness measurements:" , row['Thickness measurements'] , 1 , [4  , 22]) ,
-            ("Plating (BGA):"          , row['Plating (BGA)']          , 1 , [4  , 8])  ,
-            ("Plating (Holes):"        , row['Plating (Holes)']        , 0 , [4  , 8])  ,
-            ("Soldermask alignment:"   , row['Soldermask alignment']   , 1 , [4  , 26]) ,
-            ("Glue problems?"          , row['Glue problems?']         , 1 , [7  , 26]) ,
-            ("Test coupons (observations, continuity measurements etc.):", row['Test coupons (observations, continuity measurements etc.)'] , 2, [4, 10, 42]),
-            ("Accept?"                 , row['Accept?']                , 1 , [4  , 12]),
+            ("General comments:"       , row.general_comments , 2 , [34, 0, 42]),
+            ("Flatness:"               , row.flatness         , 1 , [2  , 2])  ,
+            ("Comments:"               , row.comments         , 0 , [25 , 0])  ,
+            ("Thickness measurements:" , row.thickness        , 1 , [4  , 22]) ,
+            ("Plating (BGA):"          , row.plating_bga      , 1 , [4  , 8])  ,
+            ("Plating (Holes):"        , row.plating_holes    , 0 , [4  , 8])  ,
+            ("Soldermask alignment:"   , row.soldermask       , 1 , [4  , 26]) ,
+            ("Glue problems?"          , row.glue             , 1 , [7  , 26]) ,
+            ("Test coupons (observations, continuity measurements etc.):", row.test_coupons , 2, [4, 10, 42]),
+            ("Accept?"                 , row.accept           , 1 , [4  , 12]),
         ]
 
         for item, value, nLines, spaces in inspection_items:
             if 'Accept' in item:
-                p = self.doc.add_paragraph()
-                self._process_image(p, row.get('image link', ''))
+                p = ctx.doc.add_paragraph()
+                self._process_image(ctx, p, row.image_link)
 
-            if nLines > 0: p = self.doc.add_paragraph()
+            if nLines > 0: p = ctx.doc.add_paragraph()
             self._add_customized_paragraph(p, item, value, spaces)
 
             if nLines == 2:
-                p = self.doc.add_paragraph()
+                p = ctx.doc.add_paragraph()
                 self._add_underlined_spaces(p, spaces[2])
 
-    def _add_second_visual_inspection(self, row):
-        self.doc.add_heading("2nd Visual Inspection – Assembled PCB", level=1)
+    def _add_second_visual_inspection(self, ctx, row):
+        ctx.doc.add_heading("2nd Visual Inspection – Assembled PCB", level=1)
 
         # Assembling data
         assembled_items = [
-            ("General comments:"    , row['p2_General comments']    , 1, [4, 29]),
-            ("Flatness:"            , row['p2_Flatness']            , 1, [4, 30]),
-            ("HGCROC type:"         , row['p2_HGCROC type']         , 1, [4,  8]),
-            ("HGCROC rotation:"     , row['p2_HGCROC rotation']     , 0, [4,  8]),
-            ("Connectors:"          , row['p2_Connectors']          , 1, [4,  8]),
-            ("Resistors/capacitors:", row['p2_Resistors/capacitors'], 0, [4,  8]),
+            ("General comments:"    , row.p2_general_comments , 1, [4, 29]),
+            ("Flatness:"            , row.p2_flatness         , 1, [4, 30]),
+            ("HGCROC type:"         , row.p2_hgcroc_type      , 1, [4,  8]),
+            ("HGCROC rotation:"     , row.p2_hgcroc_rotation  , 0, [4,  8]),
+            ("Connectors:"          , row.p2_connectors       , 1, [4,  8]),
+            ("Resistors/capacitors:", row.p2_resistors        , 0, [4,  8]),
         ]
 
         for item, value, nLines, spaces in assembled_items:
-            if nLines > 0: p = self.doc.add_paragraph()
+            if nLines > 0: p = ctx.doc.add_paragraph()
             self._add_customized_paragraph(p, item, value, spaces)
 
         # Table for chip ID and location map
-        self._add_formatted_table(row)
+        self._add_formatted_table(ctx, row)
 
         # Photo at 2nd visual inspection
-        p = self.doc.add_paragraph()
-        self._process_image(p, row.get('p2_image link', ''))
+        p = ctx.doc.add_paragraph()
+        self._process_image(ctx, p, row.p2_image_link)
 
         # Functional tests
-        self.doc.add_heading("Functional Tests", level=1)
+        ctx.doc.add_heading("Functional Tests", level=1)
         functional_tests = [
-            ("Power-on current:" , row['p2_Power-on current'] , 1, [2, 2]),
-            ("Configured OK:"    , row['p2_Configured OK']    , 0, [0, 0]),
-            ("Operating current:", row['p2_Operating current'], 0, [2, 2]),
-            ("DAQ lines OK: "    , row['p2_DAQ lines OK']     , 1, [0, 0]),
+            ("Power-on current:" , row.p2_power_on_current , 1, [2, 2]),
+            ("Configured OK:"    , row.p2_configured_ok    , 0, [0, 0]),
+            ("Operating current:", row.p2_operating_current, 0, [2, 2]),
+            ("DAQ lines OK: "    , row.p2_daq_lines_ok     , 1, [0, 0]),
         ]
 
         for item, value, nLines, spaces in functional_tests:
-            if nLines > 0: p = self.doc.add_paragraph()
+            if nLines > 0: p = ctx.doc.add_paragraph()
             self._add_customized_paragraph(p, item, value, spaces)
 
 # Usage example
@@ -0,0 +1,167 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from autoDocCreater import LINKS_SUFFIX, QualityControlDocGenerator, _init_worker, _pool_results
+from build_manifest import BuildManifest
+from image_registry import ImageRegistry
+from instrumentation import Instrumentation
+
+# stage -> QualityControlDocGenerator method, for the stages run sheet by sheet
+_SHEET_STAGES = {
+    'directories': 'create_directories',
+    'photos': 'move_photos',
+    'docx': 'move_docx',
+}
+
+def find_sheets(root, match='V3'):
+    """ CSV files under root whose name contains `match`, as sorted paths relative to root """
+    sheets = []
+    for directory, folders, files in os.walk(root):
+        folders.sort()
+        for f in files:
+            if f.endswith('.csv') and not f.endswith(LINKS_SUFFIX) and match in f:
+                sheets.append(os.path.relpath(os.path.join(directory, f), root))
+    return sorted(sheets)
+
+class BatchRunner:
+    """
+    Every sheet matching `match` under a folder, processed as one run.
+
+    The sheets share one Instrumentation, one ImageRegistry (and ImageCache, if given)
+    and one DirectoryIndex per folder. Their documents are scheduled on a single
+    process pool of `workers` processes, the concurrency limit of the whole batch
+    (folder and move stages use each sheet's io_workers threads, see **options).
+    run() writes a combined report (per sheet and totals) to batch_report.json.
+    """
+    def __init__(self, target_folder, match='V3', drive='My Drive', prefix='/content/drive/', workers=1,
+                 mode='verbose', instrumentation=None, report=None, **options):
+        self.root = os.path.join(prefix, drive, target_folder)
+        self.workers = workers
+        self.inst = instrumentation or Instrumentation(mode)
+        self.image_registry = ImageRegistry()
+        self.report_path = report or os.path.join(self.root, 'batch_report.json')
+
+        self.sheets = find_sheets(self.root, match)
+        self.inst.info(f"[INFO] {len(self.sheets)} sheets matching {match!r} in {self.root}")
+
+        self.generators, self.failed_sheets = [], []
+        self.sheet_of = {} # csv path -> sheet path relative to root
+        indexes = {} # folder -> DirectoryIndex shared by its sheets
+        for sheet in self.sheets:
+            folder = os.path.normpath(os.path.join(target_folder, os.path.dirname(sheet)))
+            base = os.path.normpath(os.path.join(prefix, drive, folder))
+            generator = QualityControlDocGenerator(folder, os.path.basename(sheet), drive=drive, prefix=prefix,
+                                                   instrumentation=self.inst, image_registry=self.image_registry,
+                                                   directory_index=indexes.get(base), **options)
+            if generator.df is None:
+                self.failed_sheets.append(sheet)
+                continue
+            indexes[base] = generator.index
+            self.sheet_of[generator.csv] = sheet
+            self.generators.append(generator)
+
+    def run(self, stages=QualityControlDocGenerator.PIPELINE_STAGES, force=False):
+        """
+        Run `stages` (in pipeline order) over every sheet; returns the combined report
+
+        Unchanged documents are skipped as in create_documents unless force=True.
+        """
+        unknown = set(stages) - set(QualityControlDocGenerator.PIPELINE_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {sorted(unknown)}")
+        stages = [stage for stage in QualityControlDocGenerator.PIPELINE_STAGES if stage in stages]
+
+        timings, documents = {}, {}
+        io_errors = {} # csv -> [{'ID', 'error'}] of the folder and move stages
+        for stage in stages:
+            start = time.perf_counter()
+            with self.inst.span(f"batch_{stage}"):
+                if stage == 'documents':
+                    documents = self._create_documents(force)
+                else:
+                    for generator in self.generators:
+                        results = getattr(generator, _SHEET_STAGES[stage])()
+                        io_errors.setdefault(generator.csv, []).extend(result for result in results if result['error'])
+            timings[stage] = time.perf_counter() - start
+
+        report = self._report(documents, io_errors, timings)
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        self._print_report(report)
+        self.inst.summary()
+        return report
+
+    def _create_documents(self, force):
+        """ Build the outdated documents of every sheet on one pool; returns csv -> results """
+        self.inst.info("[INFO] 建立docx文件：")
+        plans, tasks = {}, []
+        for generator in self.generators:
+            generator.index.sync() # files uploaded or moved by others since the index was read
+            manifest = BuildManifest(generator.manifest_path)
+            results, sheet_tasks, fingerprints = generator._plan_documents(manifest, force)
+            plans[generator.csv] = (generator, manifest, results, fingerprints)
+            tasks.extend(sheet_tasks)
+
+        # a memory budget (passed through to the generators) bounds the shared pool too
+        workers = min(generator._cap_workers(self.workers) for generator in self.generators) if self.generators else 1
+        if workers > 1 and tasks:
+            with self.inst.span('process_pool', workers=workers, tasks=len(tasks)), \
+                 ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=tuple(self.generators)) as executor:
+                for done, (task, result) in enumerate(_pool_results(executor, tasks, 2 * workers)):
+                    generator, manifest, results, fingerprints = plans[task[0]]
+                    generator._collect_document(task, result, results, manifest, fingerprints)
+                    self.inst.progress(done + 1, len(tasks))
+        else:
+            for done, task in enumerate(tasks):
+                generator, manifest, results, fingerprints = plans[task[0]]
+                result = generator._build_row(generator.records[task[1]])
+                generator._collect_document(task, result, results, manifest, fingerprints)
+                self.inst.progress(done + 1, len(tasks))
+
+        for generator, manifest, results, fingerprints in plans.values():
+            manifest.compact()
+        return {csv: results for csv, (generator, manifest, results, fingerprints) in plans.items()}
+
+    def _report(self, documents, io_errors, timings):
+        sheets = []
+        for generator in self.generators:
+            entry = {'sheet': self.sheet_of[generator.csv], 'boards': len(generator.records)}
+            entry['io_errors'] = io_errors.get(generator.csv, [])
+            results = documents.get(generator.csv)
+            if results is not None:
+                entry['skipped'] = sum(1 for result in results if result['skipped'])
+                entry['failed'] = sum(1 for result in results if result['error'])
+                entry['rebuilt'] = len(results) - entry['skipped'] - entry['failed']
+                entry['errors'] = [{'ID': result['ID'], 'error': result['error']} for result in results if result['error']]
+            sheets.append(entry)
+        sheets += [{'sheet': sheet, 'boards': 0, 'error': 'sheet not loaded'} for sheet in self.failed_sheets]
+
+        totals = {'sheets': len(self.sheets), 'failed_sheets': len(self.failed_sheets)}
+        for key in ('boards', 'rebuilt', 'skipped', 'failed'):
+            totals[key] = sum(entry.get(key, 0) for entry in sheets)
+        totals['io_errors'] = sum(len(entry.get('io_errors', ())) for entry in sheets)
+        stats = self.image_registry.stats()
+        return {'root': self.root, 'workers': self.workers, 'sheets': sheets, 'totals': totals,
+                'timings': timings, 'image_registry': {'hits': stats['hits'], 'misses': stats['misses']}}
+
+    def _print_report(self, report):
+        self.inst.info("[INFO] batch report:")
+        for entry in report['sheets']:
+            if 'error' in entry:
+                self.inst.info(f"  {entry['sheet']}: {entry['error']}")
+            elif 'rebuilt' in entry:
+                self.inst.info(f"  {entry['sheet']}: {entry['boards']} boards, {entry['rebuilt']} rebuilt, "
+                               f"{entry['skipped']} skipped, {entry['failed']} failed")
+            else:
+                self.inst.info(f"  {entry['sheet']}: {entry['boards']} boards")
+            if entry.get('io_errors'):
+                self.inst.info(f"  {entry['sheet']}: {len(entry['io_errors'])} folder/move errors")
+        totals = report['totals']
+        self.inst.info(f"  total: {totals['sheets']} sheets ({totals['failed_sheets']} not loaded), {totals['boards']} boards, "
+                       f"{totals['rebuilt']} rebuilt, {totals['skipped']} skipped, {totals['failed']} failed, "
+                       f"{totals['io_errors']} folder/move errors")
+        self.inst.info("[INFO] batch timings: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in report['timings'].items()))
+        self.inst.info(f"[INFO] report written to {self.report_path}")
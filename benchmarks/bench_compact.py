@@ -0,0 +1,65 @@
+"""
+Size and save time of compact docx output against python-docx's default save.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_compact [--boards 20] [--photo-size 2000x1500] [--levels 1 6 9] [--workdir DIR]
+
+Every board's document is saved in memory once with doc.save and once per compression
+level with compact_level set. Save time is the doc_save span (plus doc_compact for the
+compact runs).
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+
+from autoDocCreater import QualityControlDocGenerator
+from benchmarks.synthetic import make_sheet
+from instrumentation import Instrumentation
+
+CSV = 'V3-compact.csv'
+
+def save_all(generator, compact_level):
+    """ Every board's document as bytes, and the seconds spent saving them """
+    generator.compact_level = compact_level
+    generator.inst = Instrumentation('quiet')
+    blobs = []
+    for row in generator.records:
+        stream = io.BytesIO()
+        generator._create_quality_control_doc(row, stream=stream)
+        blobs.append(stream.getvalue())
+    seconds = sum(generator.inst.spans.get(name, [0, 0.0])[1] for name in ('doc_save', 'doc_compact'))
+    return blobs, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boards', type=int, default=20)
+    parser.add_argument('--photo-size', default='2000x1500')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 6, 9])
+    parser.add_argument('--workdir', default=None)
+    args = parser.parse_args()
+
+    photo_size = tuple(int(v) for v in args.photo_size.split('x'))
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='qc-compact-'))
+    try:
+        make_sheet(workdir, CSV, args.boards, photo_size=photo_size)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator = QualityControlDocGenerator('', CSV, drive='', prefix=workdir, mode='quiet')
+            defaults, base_seconds = save_all(generator, None)
+        base_bytes = sum(map(len, defaults)) / len(defaults)
+        print(f"default  : {base_bytes / 1024:8.1f} KiB/doc, save {base_seconds / len(defaults) * 1000:6.1f} ms/doc")
+
+        for level in args.levels:
+            with contextlib.redirect_stdout(io.StringIO()):
+                blobs, seconds = save_all(generator, level)
+            size = sum(map(len, blobs)) / len(blobs)
+            print(f"level {level:<3}: {size / 1024:8.1f} KiB/doc, save {seconds / len(blobs) * 1000:6.1f} ms/doc, "
+                  f"{(base_bytes - size) / 1024:6.1f} KiB saved per doc, save time x{seconds / base_seconds:.2f}")
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Filesystem calls of the link lookups over a whole run: per-link os.path.exists probing
+against the DirectoryIndex.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_dir_index [--boards 50] [--workdir DIR]
+
+For each lookup strategy a fresh synthetic sheet is laid out and the four stages run in
+order (create_directories, move_photos, create_documents, move_docx); the os.stat and
+os.scandir calls of each stage are counted, including the index's own syncs.
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from autoDocCreater import QualityControlDocGenerator
+from benchmarks.synthetic import make_sheet
+
+CSV = 'V3-index.csv'
+STAGES = ('create_directories', 'move_photos', 'create_documents', 'move_docx')
+
+@contextmanager
+def count_calls(counts):
+    originals = {name: getattr(os, name) for name in ('stat', 'scandir')}
+
+    def wrap(name, func):
+        def counted(*args, **kwargs):
+            counts[name] = counts.get(name, 0) + 1
+            return func(*args, **kwargs)
+        return counted
+
+    for name, func in originals.items():
+        setattr(os, name, wrap(name, func))
+    try:
+        yield counts
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+def probe(generator):
+    """ The former _find_path: up to two os.path.exists calls per link, no index syncs """
+    def find_path(ctx, link, verbosity=False):
+        if not link or not link.strip():
+            return 0, None
+        for i, directory in enumerate((generator.base, ctx.folder)):
+            path = os.path.join(directory, link)
+            if os.path.exists(path):
+                return i + 1, path
+        return 3, None
+    generator._find_path = find_path
+    generator.index.sync = lambda: 0
+
+def indexed(generator):
+    pass
+
+def run(folder, boards, strategy):
+    shutil.rmtree(folder, ignore_errors=True)
+    make_sheet(folder, CSV, boards, photo_size=(64, 48), distinct_photos=2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = QualityControlDocGenerator('', CSV, drive='', prefix=folder, mode='quiet')
+    strategy(generator)
+
+    counts = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for stage in STAGES:
+            with count_calls({}) as counts[stage]:
+                getattr(generator, stage)()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boards', type=int, default=50)
+    parser.add_argument('--workdir', default=None)
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='qc-index-'))
+    try:
+        for name, strategy in (('probe', probe), ('index', indexed)):
+            counts = run(os.path.join(workdir, 'boards'), args.boards, strategy)
+            stat = sum(c.get('stat', 0) for c in counts.values())
+            scandir = sum(c.get('scandir', 0) for c in counts.values())
+            print(f"{name:>6}: {stat:6d} stat, {scandir:4d} scandir for {args.boards} boards  ("
+                  + ", ".join(f"{stage} {c.get('stat', 0)}/{c.get('scandir', 0)}" for stage, c in counts.items()) + ")")
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Folder creation and moves on a slow file system, serial against the I/O thread pool.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_io [--boards 200] [--latency 0.01] [--workers 1 4 16] [--workdir DIR]
+
+A network mount is mimicked by sleeping `latency` seconds in every os.makedirs, os.rename
+and os.path.exists call (the sleep releases the GIL, as a blocking mount round trip does).
+For every --workers value a fresh sheet is laid out, a placeholder docx is written per board,
+then create_directories, move_photos and move_docx run with that many threads.
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from autoDocCreater import QualityControlDocGenerator
+from benchmarks.synthetic import make_sheet
+
+CSV = 'V3-io.csv'
+STAGES = ('create_directories', 'move_photos', 'move_docx')
+
+def _slowed(function, latency):
+    def call(*args, **kwargs):
+        time.sleep(latency)
+        return function(*args, **kwargs)
+    return call
+
+@contextlib.contextmanager
+def slow_filesystem(latency):
+    """ os.makedirs / os.rename / os.path.exists with `latency` seconds added to each call """
+    with mock.patch('os.makedirs', _slowed(os.makedirs, latency)), \
+         mock.patch('os.rename', _slowed(os.rename, latency)), \
+         mock.patch('os.path.exists', _slowed(os.path.exists, latency)):
+        yield
+
+def run(folder, boards, latency, workers):
+    shutil.rmtree(folder, ignore_errors=True)
+    make_sheet(folder, CSV, boards, photo_size=(64, 48), distinct_photos=2)
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator = QualityControlDocGenerator('', CSV, drive='', prefix=folder, mode='quiet')
+    for row in generator.records:
+        with open(os.path.join(generator.base, row.doc_name + '.docx'), 'wb'):
+            pass
+    generator.index.refresh()
+
+    timings = {}
+    with slow_filesystem(latency), contextlib.redirect_stdout(io.StringIO()):
+        for stage in STAGES:
+            start = time.perf_counter()
+            getattr(generator, stage)(workers=workers)
+            timings[stage] = time.perf_counter() - start
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boards', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.01, help="seconds added to every file-system call")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--workdir', default=None)
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='qc-io-'))
+    serial = None
+    try:
+        for workers in args.workers:
+            timings = run(os.path.join(workdir, 'boards'), args.boards, args.latency, workers)
+            total = sum(timings.values())
+            serial = serial or total
+            print(f"workers {workers:>3}: {total:6.2f}s ({serial / total:5.1f}x)  "
+                  + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
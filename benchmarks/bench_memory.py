@@ -0,0 +1,59 @@
+"""
+Peak Python memory of create_documents as the board count grows, with and without a memory budget.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_memory [--sizes 20 80] [--photo-size 2000x1500] [--budget-mb 512] [--workdir DIR]
+
+Peaks are measured with tracemalloc from the generator's construction to the end of
+create_documents.
+"""
+import argparse
+import contextlib
+import gc
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from autoDocCreater import QualityControlDocGenerator
+from benchmarks.synthetic import make_sheet
+
+CSV = 'V3-memory.csv'
+
+def peak(folder, budget):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator = QualityControlDocGenerator(folder, CSV, drive='', prefix='', memory_budget=budget, mode='quiet')
+            generator.create_documents(force=True)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20, 80])
+    parser.add_argument('--photo-size', default='2000x1500')
+    parser.add_argument('--budget-mb', type=int, default=512)
+    parser.add_argument('--workdir', default=None)
+    args = parser.parse_args()
+
+    photo_size = tuple(int(v) for v in args.photo_size.split('x'))
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='qc-memory-'))
+    try:
+        for boards in sorted(args.sizes):
+            folder = os.path.join(workdir, f'boards_{boards}')
+            shutil.rmtree(folder, ignore_errors=True)
+            make_sheet(folder, CSV, boards, photo_size=photo_size)
+            unbounded = peak(folder, None)
+            bounded = peak(folder, args.budget_mb * 1024**2)
+            print(f"{boards:>6} boards: peak {unbounded / 1024**2:8.1f} MiB unbounded, "
+                  f"{bounded / 1024**2:8.1f} MiB with a {args.budget_mb} MiB budget")
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
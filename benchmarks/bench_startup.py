@@ -0,0 +1,35 @@
+"""
+Start-up cost of the command-line entry point.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_startup [--repeat 5]
+
+Times `python cli.py --help` in fresh interpreters.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_help(repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(ROOT, 'cli.py'), '--help'],
+                       check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    times = time_help(args.repeat)
+    print(f"cli.py --help : best {min(times) * 1000:.1f} ms, mean {sum(times) / len(times) * 1000:.1f} ms over {len(times)} runs")
+
+if __name__ == "__main__":
+    main()
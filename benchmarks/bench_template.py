@@ -0,0 +1,64 @@
+"""
+Docs/sec of the run-by-run builder against the compiled-template engine.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_template <folder> <csv> [--drive .] [--prefix ./] [--repeat 3]
+
+Documents are saved in memory; the mean number of XML elements in document.xml is reported.
+"""
+import argparse
+import io
+import time
+import zipfile
+
+from lxml import etree
+
+from autoDocCreater import QualityControlDocGenerator, _RowContext
+
+def _render(generator, row):
+    ctx = _RowContext(generator.base, row)
+    if generator.engine == 'template':
+        ctx.doc = generator._get_template().render(ctx, row)
+    else:
+        import docx
+        ctx.doc = docx.Document()
+        generator._build_document(ctx, row)
+    stream = io.BytesIO()
+    ctx.doc.save(stream)
+    return stream.getvalue()
+
+def _elements(blob):
+    with zipfile.ZipFile(io.BytesIO(blob)) as z:
+        return len(etree.fromstring(z.read('word/document.xml')).xpath('//*'))
+
+def run(generator, repeat):
+    rows = generator.records
+    results, outputs = {}, {}
+    for engine in ('builder', 'template'):
+        generator.engine = engine
+        if engine == 'template':
+            generator._get_template() # compile outside the timed loop
+        start = time.perf_counter()
+        for _ in range(repeat):
+            outputs[engine] = [_render(generator, row) for row in rows]
+        elapsed = time.perf_counter() - start
+        results[engine] = len(rows) * repeat / elapsed if elapsed else float('inf')
+
+    elements = sum(_elements(blob) for blob in outputs['builder']) / len(rows) if rows else 0
+    return results, elements
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('folder')
+    parser.add_argument('csv')
+    parser.add_argument('--drive', default='.')
+    parser.add_argument('--prefix', default='./')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    generator = QualityControlDocGenerator(args.folder, args.csv, drive=args.drive, prefix=args.prefix)
+    results, elements = run(generator, args.repeat)
+    for engine, rate in results.items():
+        print(f"{engine:>8}: {rate:8.1f} docs/sec")
+    print(f"speed-up: {results['template'] / results['builder']:.2f}x")
+    print(f"document.xml: {elements:.0f} elements per document")
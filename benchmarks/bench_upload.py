@@ -0,0 +1,76 @@
+"""
+Direct Drive upload of the generated documents, against the local fake Drive service.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_upload [--boards 40] [--photo-size 1200x900] [--latency 0.02]
+                                      [--fail-every 25] [--upload-workers 1 4 8] [--workdir DIR]
+
+For every --upload-workers value the documents are built in memory and uploaded with
+create_documents_drive; the two-step save-then-move (create_documents + move_docx) is timed
+for reference.
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from autoDocCreater import QualityControlDocGenerator
+from benchmarks.fake_drive import FakeDriveService, FakeMedia
+from benchmarks.synthetic import make_sheet
+from safe_move import SharedDriveMover
+
+CSV = 'V3-upload.csv'
+FOLDER = 'autoDoc'
+
+def _generator(workdir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return QualityControlDocGenerator(FOLDER, CSV, drive='', prefix=workdir, mode='quiet')
+
+def two_step(workdir):
+    generator = _generator(workdir)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator.create_documents(force=True)
+        generator.move_docx()
+    return time.perf_counter() - start
+
+def upload(workdir, latency, fail_every, upload_workers):
+    generator = _generator(workdir)
+    service = FakeDriveService('HGCAL', latency=latency, fail_every=fail_every)
+    mover = SharedDriveMover(service=service, media_class=FakeMedia)
+    links = os.path.join(workdir, f'links_{upload_workers}.csv')
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator.create_documents_drive(shared_drive='HGCAL', upload_workers=upload_workers,
+                                         links=links, mover=mover)
+    return time.perf_counter() - start, service
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--boards', type=int, default=40)
+    parser.add_argument('--photo-size', default='1200x900')
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds per fake Drive request")
+    parser.add_argument('--fail-every', type=int, default=25, help="answer every n-th upload chunk with a 429 (0: never)")
+    parser.add_argument('--upload-workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--workdir', default=None)
+    args = parser.parse_args()
+
+    photo_size = tuple(int(v) for v in args.photo_size.split('x'))
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='qc-upload-'))
+    try:
+        make_sheet(os.path.join(workdir, FOLDER), CSV, args.boards, photo_size=photo_size)
+        print(f"save + move : {two_step(workdir):6.2f}s for {args.boards} boards (local disk)")
+        for upload_workers in args.upload_workers:
+            elapsed, service = upload(workdir, args.latency, args.fail_every, upload_workers)
+            print(f"upload x{upload_workers:<3}: {elapsed:6.2f}s for {args.boards} boards, "
+                  f"{service.chunks} chunks, {service.failures} throttled and resumed")
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
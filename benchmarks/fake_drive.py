@@ -0,0 +1,220 @@
+"""
+In-memory stand-in for the part of the Drive v3 service used by safe_move, to exercise the
+upload and move paths without Google credentials or the Google client libraries.
+
+    service = FakeDriveService('HGCAL', latency=0.01, fail_every=7)
+    mover = SharedDriveMover(service=service, media_class=FakeMedia)
+
+Supported: drives().list, files().list (name / mimeType / parents queries, pagination),
+files().create and files().update (folders, metadata and resumable media uploads), and
+batch requests (new_batch_http_request). `fail_every` answers every n-th upload chunk
+with a 429 rate-limit error; `batch_fail_every` every n-th call inside a batch with a 403
+rateLimitExceeded, and `throttle_batches` the first n batch requests as a whole with a 429.
+`latency` is slept per request (a batch is one), outside the lock, so concurrent uploads
+overlap as they would.
+"""
+import itertools
+import re
+import threading
+import time
+import types
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+class FakeHttpError(Exception):
+    """ Shaped like googleapiclient.errors.HttpError: resp.status and content """
+    def __init__(self, status, content=b''):
+        super().__init__(f"HTTP {status}: {content.decode('utf-8', 'replace')}")
+        self.resp = types.SimpleNamespace(status=status)
+        self.content = content
+
+class FakeMedia:
+    """ Same constructor and reads as googleapiclient.http.MediaIoBaseUpload """
+    def __init__(self, fd, mimetype, chunksize=5 * 1024**2, resumable=False):
+        self._fd = fd
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._resumable = resumable
+
+    def mimetype(self):
+        return self._mimetype
+
+    def chunksize(self):
+        return self._chunksize
+
+    def resumable(self):
+        return self._resumable
+
+    def size(self):
+        position = self._fd.tell()
+        self._fd.seek(0, 2)
+        size = self._fd.tell()
+        self._fd.seek(position)
+        return size
+
+    def getbytes(self, begin, length):
+        self._fd.seek(begin)
+        return self._fd.read(length)
+
+class _Request:
+    def __init__(self, service, execute):
+        self._service = service
+        self._execute = execute
+
+    def execute(self, **kwargs):
+        self._service._wait()
+        with self._service.lock:
+            return self._execute()
+
+class _BatchRequest:
+    """ Same add/execute as googleapiclient.http.BatchHttpRequest: one callback per added request """
+    def __init__(self, service, callback):
+        self._service = service
+        self._callback = callback
+        self._requests = []
+
+    def add(self, request, request_id=None):
+        self._requests.append((request_id or str(len(self._requests)), request))
+
+    def execute(self, **kwargs):
+        service = self._service
+        service._wait()
+        outcomes = []
+        with service.lock:
+            service._count('batch')
+            if service.throttled_batches < service.throttle_batches:
+                service.throttled_batches += 1
+                raise FakeHttpError(429, b'rateLimitExceeded')
+            for request_id, request in self._requests:
+                service.batched += 1
+                if service.batch_fail_every and service.batched % service.batch_fail_every == 0:
+                    service.failures += 1
+                    outcomes.append((request_id, None, FakeHttpError(403, b'{"reason": "rateLimitExceeded"}')))
+                else:
+                    outcomes.append((request_id, request._execute(), None))
+        for outcome in outcomes:
+            self._callback(*outcome)
+
+class _UploadRequest:
+    """ Resumable upload: next_chunk() sends one chunk and returns (progress, response or None) """
+    def __init__(self, service, media, finish):
+        self._service = service
+        self._media = media
+        self._finish = finish
+        self._received = bytearray()
+
+    def next_chunk(self):
+        service = self._service
+        service._wait()
+        with service.lock:
+            service.chunks += 1
+            if service.fail_every and service.chunks % service.fail_every == 0:
+                service.failures += 1
+                raise FakeHttpError(429, b'rateLimitExceeded')
+            size = self._media.size()
+            self._received += self._media.getbytes(len(self._received), self._media.chunksize())
+            if len(self._received) < size:
+                return len(self._received) / size, None
+            return 1.0, self._finish(bytes(self._received))
+
+    def execute(self, **kwargs):
+        response = None
+        while response is None:
+            _, response = self.next_chunk()
+        return response
+
+class FakeDriveService:
+    def __init__(self, drive_name='Shared', latency=0.0, fail_every=0, batch_fail_every=0, throttle_batches=0):
+        self.drive = {'id': 'drive0', 'name': drive_name}
+        self.latency = latency
+        self.fail_every = fail_every
+        self.batch_fail_every = batch_fail_every
+        self.throttle_batches = throttle_batches
+        self.batched = 0 # calls sent inside batch requests
+        self.throttled_batches = 0
+        self.items = {} # id -> {'id', 'name', 'mimeType', 'parents', 'data'}
+        self.calls = {}
+        self.chunks = 0
+        self.failures = 0
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    # service.drives() / service.files()
+    def drives(self):
+        return types.SimpleNamespace(list=self._list_drives)
+
+    def files(self):
+        return types.SimpleNamespace(list=self._list_files, create=self._create, update=self._update)
+
+    def new_batch_http_request(self, callback=None):
+        return _BatchRequest(self, callback)
+
+    def _list_drives(self, pageSize=100, pageToken=None, **kwargs):
+        def execute():
+            self._count('drives.list')
+            return {'drives': [self.drive]}
+        return _Request(self, execute)
+
+    def _list_files(self, q='', pageSize=100, pageToken=None, **kwargs):
+        names = re.findall(r"name='([^']*)'", q)
+        parents = re.findall(r"'([^']*)' in parents", q)
+        mimes = re.findall(r"mimeType='([^']*)'", q)
+
+        def execute():
+            self._count('files.list')
+            found = [item for item in self.items.values()
+                     if (not names or item['name'] == names[0])
+                     and (not parents or parents[0] in item['parents'])
+                     and (not mimes or item['mimeType'] == mimes[0])]
+            start = int(pageToken or 0)
+            page = {'files': [{key: item[key] for key in ('id', 'name', 'parents')} for item in found[start:start + pageSize]]}
+            if start + pageSize < len(found):
+                page['nextPageToken'] = str(start + pageSize)
+            return page
+        return _Request(self, execute)
+
+    def _response(self, item):
+        return {'id': item['id'], 'name': item['name'], 'webViewLink': f"https://fake.drive/{item['id']}"}
+
+    def _create(self, body, media_body=None, **kwargs):
+        def finish(data):
+            self._count('files.create')
+            item = {'id': f"file{next(self._ids)}", 'name': body['name'], 'parents': list(body.get('parents', [])),
+                    'mimeType': body.get('mimeType') or (media_body.mimetype() if media_body else ''), 'data': data}
+            self.items[item['id']] = item
+            return self._response(item)
+        if media_body is not None:
+            return _UploadRequest(self, media_body, finish)
+        return _Request(self, lambda: finish(None))
+
+    def _update(self, fileId, media_body=None, addParents=None, removeParents=None, **kwargs):
+        def finish(data):
+            self._count('files.update')
+            item = self.items[fileId]
+            if data is not None:
+                item['data'] = data
+            if addParents:
+                item['parents'] = [p for p in item['parents'] if p != removeParents] + [addParents]
+            return self._response(item)
+        if media_body is not None:
+            return _UploadRequest(self, media_body, finish)
+        return _Request(self, lambda: finish(None))
+
+    # inspection helpers
+    def path_of(self, file_id):
+        """ 'folder/.../name' of an item, from the drive root """
+        parts, item = [], self.items[file_id]
+        while item is not None:
+            parts.append(item['name'])
+            item = self.items.get(item['parents'][0]) if item['parents'] else None
+        return '/'.join(reversed(parts))
+
+    def files_by_path(self):
+        return {self.path_of(item['id']): item['data'] for item in self.items.values() if item['mimeType'] != FOLDER_MIME}
@@ -0,0 +1,92 @@
+"""
+Time every QualityControlDocGenerator stage on synthetic sheets and record the results as JSON.
+
+Usage (from the repository root):
+    python -m benchmarks.run [--sizes 10 1000 10000] [--photo-size 4000x3000] [--workdir DIR]
+                             [--engine builder|template] [--workers N] [--output results.json]
+                             [--compare previous.json]
+
+Photos are hard-linked from a small pool, but every generated document embeds its
+photos: budget disk space for the largest size accordingly (or pass a smaller --photo-size).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+from autoDocCreater import QualityControlDocGenerator
+from benchmarks.synthetic import make_sheet
+
+CSV = 'V3-synthetic.csv'
+
+def _timed(timings, stage, func, *args, **kwargs):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # per-file prints would dominate the timing
+        result = func(*args, **kwargs)
+    timings[stage] = time.perf_counter() - start
+    return result
+
+def run_size(workdir, boards, photo_size, engine, workers):
+    folder = os.path.join(workdir, f'boards_{boards}')
+    shutil.rmtree(folder, ignore_errors=True)
+    start = time.perf_counter()
+    make_sheet(folder, CSV, boards, photo_size=photo_size)
+    setup = time.perf_counter() - start
+
+    timings = {}
+    generator = _timed(timings, 'load', QualityControlDocGenerator, folder, CSV, drive='', prefix='', engine=engine)
+    _timed(timings, 'create_directories', generator.create_directories)
+    _timed(timings, 'move_photos', generator.move_photos)
+    _timed(timings, 'create_documents', generator.create_documents, workers=workers, force=True)
+    _timed(timings, 'move_docx', generator.move_docx)
+    _timed(timings, 'move_back_photos', generator.move_back_photos)
+    timings['total'] = sum(timings.values())
+    print(f"{boards:>6} boards (setup {setup:.1f}s): " + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+    shutil.rmtree(folder, ignore_errors=True)
+    return timings
+
+def compare(current, previous):
+    print("\nratio to previous run (< 1 is faster):")
+    for boards, timings in current['sizes'].items():
+        before = previous.get('sizes', {}).get(boards)
+        if not before: continue
+        ratios = {stage: seconds / before[stage] for stage, seconds in timings.items() if before.get(stage)}
+        print(f"{boards:>6} boards: " + ", ".join(f"{k} {v:.2f}" for k, v in ratios.items()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--photo-size', default='4000x3000')
+    parser.add_argument('--workdir', default=None)
+    parser.add_argument('--engine', default='builder', choices=['builder', 'template'])
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None)
+    args = parser.parse_args()
+
+    photo_size = tuple(int(v) for v in args.photo_size.lower().split('x'))
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='tidc_bench_'))
+    results = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+            'platform': platform.platform(), 'photo_size': args.photo_size,
+            'engine': args.engine, 'workers': args.workers,
+        },
+        'sizes': {},
+    }
+    for boards in args.sizes:
+        results['sizes'][str(boards)] = run_size(workdir, boards, photo_size, args.engine, args.workers)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
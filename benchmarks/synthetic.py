@@ -0,0 +1,101 @@
+"""
+Synthetic QC tracking sheets and inspection photos in the layout of autoDoc/test.csv:
+two preamble rows, then the header row with the columns read by the document builders.
+"""
+import csv
+import os
+import random
+import shutil
+import struct
+import zlib
+
+from autoDocCreater import QualityControlDocGenerator
+
+# extra columns of the real export that the builders do not read
+EXTRA_COLUMNS = ['CERN ID', '入庫NTU', '拍照', '溢膠檢查\n階梯孔+邊緣=', '溢膠檢查_備註', '標籤', '已上件', '備註']
+
+PREAMBLE = [
+    {'ID': 'CERN ID', 'Manufacturer': '製造商', 'image link': '拍照 圖檔', 'Flatness': 'Flatness紀錄'},
+    {'General comments': 'Bare PCB', 'p2_General comments': 'Assembled PCB(上件)'},
+]
+
+CHIP_MAP = 'chip_location_map.png'
+
+# columns left blank on every fourth board, as unfilled cells of the real export
+BLANK_COLUMNS = ['title page1', 'Manufacturer', 'General comments', 'p2_Chip ID']
+
+def columns():
+    return ['User'] + [col for col in QualityControlDocGenerator.DOCUMENT_COLUMNS if col != 'User'] + EXTRA_COLUMNS
+
+def _png(path, width, height, rng):
+    """ Noise PNG written with zlib only (no Pillow needed) """
+    raw = b''.join(b'\x00' + rng.randbytes(width * 3) for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(raw, 1)))
+        f.write(chunk(b'IEND', b''))
+
+def _photo(path, size, rng):
+    """ Camera-like photo: a noise JPEG with Pillow, a noise PNG without """
+    try:
+        from PIL import Image
+    except ImportError:
+        path = os.path.splitext(path)[0] + '.png'
+        _png(path, size[0], size[1], rng)
+        return path
+    Image.frombytes('RGB', size, rng.randbytes(size[0] * size[1] * 3)).save(path, quality=92)
+    return path
+
+def _place(pool_path, path):
+    """ Hard-link a pool photo under a board's name (copy where links are not supported) """
+    try:
+        os.link(pool_path, path)
+    except OSError:
+        shutil.copyfile(pool_path, path)
+
+def make_sheet(folder, filename, boards, photo_size=(4000, 3000), distinct_photos=8, seed=0, first_board=0):
+    """
+    Write a sheet of `boards` rows plus their photos into `folder`; returns the CSV path.
+
+    Each board gets its own 'image link' and 'p2_image link' file, linked to one of
+    `distinct_photos` generated photos; the chip location map is shared by all boards.
+    Every fourth board leaves the BLANK_COLUMNS empty.
+    Boards are numbered from `first_board`, so that several sheets can share a folder.
+    """
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    pool_dir = os.path.join(folder, '.photo_pool')
+    os.makedirs(pool_dir, exist_ok=True)
+    pool = [_photo(os.path.join(pool_dir, f'photo_{i}.jpg'), photo_size, rng) for i in range(distinct_photos)]
+    _png(os.path.join(folder, CHIP_MAP), 1200, 900, rng)
+
+    header = columns()
+    path = os.path.join(folder, filename)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        for preamble in PREAMBLE:
+            writer.writerow([preamble.get(col, '') for col in header])
+        writer.writerow(header)
+
+        for i in range(first_board, first_board + boards):
+            cern_id = f'320XHF1TCV{i:05d}'
+            row = {col: f'{col.split()[0]} {i}' for col in header}
+            row.update({
+                'User': f'operator{i % 4}', 'Date': f'2024/{i % 12 + 1}/{i % 28 + 1}', 'Version': 'V3',
+                'ID': cern_id, 'p2_ID': cern_id, 'CERN ID': cern_id, 'filename+ID': f'QC_{cern_id}',
+                'title page1': 'Hexaboard Visual Inspection', 'title page2': 'Hexaboard Assembly Inspection',
+                'Accept?': 'Yes' if i % 10 else 'No', 'p2_Chip location map link': CHIP_MAP,
+            })
+            if i % 4 == 3: # fields left blank in the sheet
+                row.update(dict.fromkeys(BLANK_COLUMNS, ''))
+            for col, prefix in (('image link', 'bare'), ('p2_image link', 'assembled')):
+                source = pool[rng.randrange(len(pool))]
+                row[col] = f'{prefix}_{cern_id}{os.path.splitext(source)[1]}'
+                _place(source, os.path.join(folder, row[col]))
+            writer.writerow([row[col] for col in header])
+    return path
@@ -0,0 +1,41 @@
+import json
+import os
+
+class BuildManifest:
+    """
+    Record of the inputs each document was last built from, stored next to the CSV.
+
+    Entries are appended one line per built document, so an interrupted run keeps
+    everything finished so far and the next run resumes from there. compact()
+    rewrites the file with the latest entry of every document.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError: # line cut short by an interrupted run
+                    continue
+                self.entries[entry['key']] = entry['fingerprint']
+
+    def is_current(self, key, fingerprint):
+        return self.entries.get(key) == fingerprint
+
+    def record(self, key, fingerprint):
+        self.entries[key] = fingerprint
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'key': key, 'fingerprint': fingerprint}, ensure_ascii=False) + '\n')
+
+    def compact(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            for key, fingerprint in self.entries.items():
+                f.write(json.dumps({'key': key, 'fingerprint': fingerprint}, ensure_ascii=False) + '\n')
+        os.replace(tmp, self.path)
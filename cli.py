@@ -0,0 +1,147 @@
+"""
+tidc-autodoc: command-line entry point of the QC document generator.
+
+pandas, python-docx and the Google client libraries are imported only by the
+command that needs them, so --help and argument errors return immediately.
+"""
+import argparse
+import os
+import sys
+
+# command -> QualityControlDocGenerator method
+STAGE_COMMANDS = {
+    'directories': 'create_directories',
+    'photos': 'move_photos',
+    'documents': 'create_documents',
+    'docx': 'move_docx',
+    'restore': 'move_back_photos',
+}
+
+PIPELINE_STAGES = ('directories', 'photos', 'documents', 'docx') # QualityControlDocGenerator.PIPELINE_STAGES
+
+def _common_options(batch=False):
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('folder', help="folder holding the CSV and the photos, relative to <prefix>/<drive>")
+    if batch:
+        parser.add_argument('--match', default='V3', help="run every CSV under the folder whose name contains this (default: V3)")
+    else:
+        parser.add_argument('--csv', default=None, help="CSV file name (default: the first CSV whose name contains --match)")
+        parser.add_argument('--match', default='V3', help="name filter used to pick the CSV (default: V3)")
+    parser.add_argument('--drive', default='My Drive')
+    parser.add_argument('--prefix', default='/content/drive/')
+    parser.add_argument('--mode', default='summary', choices=['quiet', 'summary', 'verbose'])
+    parser.add_argument('--engine', default='builder', choices=['builder', 'template'])
+    parser.add_argument('--image-cache', default=None, metavar='DIR', help="downsample photos into this cache folder")
+    parser.add_argument('--csv-columns', default='all', choices=['all', 'used'])
+    parser.add_argument('--csv-cache', action='store_true',
+                        help="cache the parsed sheet in a local folder (~/.cache/tidc_auto_doc or $XDG_CACHE_HOME)")
+    parser.add_argument('--memory-budget', type=int, default=None, metavar='MB',
+                        help="bounded-memory mode: stream the sheet, release images after each save, fit the pool in MB")
+    parser.add_argument('--compact', type=int, nargs='?', const=6, default=None, choices=range(10), metavar='LEVEL',
+                        help="compact docx: drop unused template parts and styles, store photos, deflate XML at LEVEL (default 6)")
+    parser.add_argument('--io-workers', type=int, default=1, metavar='N',
+                        help="threads for folder creation and moves (worth raising on a network drive)")
+    parser.add_argument('--trace', default=None, metavar='JSON', help="export a timing trace to this file")
+    return parser
+
+def build_parser():
+    common = _common_options()
+    parser = argparse.ArgumentParser(prog='tidc-autodoc', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('directories', parents=[common], help="create the CERN-ID folders")
+    commands.add_parser('photos', parents=[common], help="move the photos into their CERN-ID folders")
+    restore = commands.add_parser('restore', parents=[common], help="move the photos back to the base folder")
+    restore.add_argument('--workers', type=int, default=8)
+    documents = commands.add_parser('documents', parents=[common], help="create the docx documents")
+    documents.add_argument('--workers', type=int, default=1)
+    documents.add_argument('--force', action='store_true', help="rebuild unchanged documents too")
+    documents.add_argument('--archive', action='store_true', help="write the documents into zip archives")
+    documents.add_argument('--shard-size', type=int, default=None)
+    documents.add_argument('--upload', action='store_true',
+                           help="upload the documents from memory into their Drive folders, links in <csv>.links.csv")
+    documents.add_argument('--shared-drive', default=None, help="shared drive to upload to (default: last component of --drive)")
+    documents.add_argument('--upload-workers', type=int, default=4)
+    commands.add_parser('docx', parents=[common], help="move the documents into their CERN-ID folders")
+    pipeline = commands.add_parser('pipeline', parents=[common], help="run the stages board by board")
+    pipeline.add_argument('--stages', nargs='+', default=list(PIPELINE_STAGES), choices=PIPELINE_STAGES)
+    pipeline.add_argument('--force', action='store_true', help="rebuild unchanged documents too")
+    watch = commands.add_parser('watch', parents=[common], help="re-run the stages for boards whose photos or sheet rows change")
+    watch.add_argument('--interval', type=float, default=2.0, help="seconds between folder polls")
+    watch.add_argument('--debounce', type=float, default=5.0, help="quiet seconds before a burst of changes is processed")
+    watch.add_argument('--stages', nargs='+', default=list(PIPELINE_STAGES), choices=PIPELINE_STAGES)
+    batch = commands.add_parser('batch', parents=[_common_options(batch=True)],
+                                help="run every matching sheet under the folder on one worker pool")
+    batch.add_argument('--workers', type=int, default=1, help="document processes shared by all sheets")
+    batch.add_argument('--stages', nargs='+', default=list(PIPELINE_STAGES), choices=PIPELINE_STAGES)
+    batch.add_argument('--force', action='store_true', help="rebuild unchanged documents too")
+    batch.add_argument('--report', default=None, metavar='JSON', help="combined report (default: <folder>/batch_report.json)")
+    return parser
+
+def _find_csv(base, match):
+    candidates = sorted(f for f in os.listdir(base)
+                        if f.endswith('.csv') and not f.endswith('.links.csv') and match in f) # not an upload's link sheet
+    if not candidates:
+        raise SystemExit(f"tidc-autodoc: no CSV containing {match!r} in {base}")
+    return candidates[0]
+
+def _options(args):
+    """ Generator keyword arguments shared by the sheet and batch commands """
+    image_cache = None
+    if args.image_cache:
+        from image_cache import ImageCache
+        image_cache = ImageCache(args.image_cache)
+    return dict(drive=args.drive, prefix=args.prefix, engine=args.engine, image_cache=image_cache,
+                csv_columns=args.csv_columns, csv_cache=args.csv_cache, mode=args.mode,
+                memory_budget=args.memory_budget * 1024**2 if args.memory_budget else None,
+                io_workers=args.io_workers, compact_level=args.compact)
+
+def _generator(args):
+    from autoDocCreater import QualityControlDocGenerator # pandas + python-docx
+
+    csv = args.csv or _find_csv(os.path.join(args.prefix, args.drive, args.folder), args.match)
+    return QualityControlDocGenerator(args.folder, csv, **_options(args))
+
+def _run_batch(args):
+    from batch_runner import BatchRunner
+
+    runner = BatchRunner(args.folder, match=args.match, workers=args.workers, report=args.report, **_options(args))
+    report = runner.run(stages=args.stages, force=args.force)
+    if args.trace:
+        runner.inst.export_trace(args.trace)
+    totals = report['totals']
+    return 1 if totals['failed'] or totals['failed_sheets'] or totals['io_errors'] else 0
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == 'batch':
+        return _run_batch(args)
+
+    generator = _generator(args)
+    if generator.df is None:
+        return 1
+
+    results = []
+    if args.command == 'pipeline':
+        results = generator.run_pipeline(stages=args.stages, force=args.force)['results']
+    elif args.command == 'documents' and args.upload:
+        results = generator.create_documents_drive(workers=args.workers, shared_drive=args.shared_drive,
+                                                   upload_workers=args.upload_workers)
+    elif args.command == 'documents':
+        results = generator.create_documents(workers=args.workers, force=args.force,
+                                             output='archive' if args.archive else 'files', shard_size=args.shard_size)
+    elif args.command == 'watch':
+        for cycle in generator.watch(interval=args.interval, debounce=args.debounce, stages=args.stages):
+            results += cycle['results']
+    elif args.command == 'restore':
+        generator.move_back_photos(workers=args.workers)
+    else:
+        results = getattr(generator, STAGE_COMMANDS[args.command])()
+
+    if args.trace:
+        generator.inst.export_trace(args.trace)
+    return 1 if any(result['error'] for result in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
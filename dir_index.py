@@ -0,0 +1,122 @@
+import os
+import time
+
+class DirectoryIndex:
+    """
+    File names of a base folder and its sub-folders (CERN IDs), read with one
+    os.scandir pass so that link lookups need no os.path.exists round trip.
+    The generator keeps it current as it creates folders, saves and moves files.
+
+    Changes made by others (photos uploaded while a run is going on) are picked up
+    by sync(), which re-reads only the directories whose modification time changed.
+    Directories the generator changed itself through add/discard/move/add_folder are
+    not re-read as long as their modification time is not later than that change, so
+    an outside change landing between the last sync and the generator's own change goes
+    unseen until the directory changes again. Likewise a change within the timestamp resolution of the file system after the last read
+    (up to 2 s on some network mounts) can go unseen until the directory changes again.
+    """
+    def __init__(self, base):
+        self.base = base
+        self._entries = {}
+        self._mtimes = {} # directory -> st_mtime_ns when it was read
+        self._touched = {} # directory -> time.time_ns() of its last change made through this index
+        self.refresh()
+
+    def refresh(self):
+        """ Re-read base and its sub-folders from disk """
+        self._entries, self._mtimes, self._touched = {}, {}, {}
+        self._read_base()
+        for directory in list(self._entries):
+            if directory != os.path.normpath(self.base):
+                self._read(directory)
+
+    def sync(self):
+        """ Re-read the directories changed on disk since they were read; returns how many were """
+        base = os.path.normpath(self.base)
+        touched, self._touched = self._touched, {}
+        changed = 0
+        mtime = os.stat(base).st_mtime_ns
+        if mtime <= touched.get(base, -1): # our own change was the last one
+            self._mtimes[base] = mtime
+        elif mtime != self._mtimes.get(base): # files or sub-folders added, removed or renamed
+            self._read_base()
+            self._mtimes = {directory: mtime for directory, mtime in self._mtimes.items() if directory in self._entries}
+            changed += 1
+        for directory in list(self._entries):
+            if directory == base:
+                continue
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                self._entries.pop(directory)
+                self._mtimes.pop(directory, None)
+                continue
+            if mtime <= touched.get(directory, -1):
+                self._mtimes[directory] = mtime
+            elif mtime != self._mtimes.get(directory):
+                self._read(directory)
+                changed += 1
+        return changed
+
+    def _read_base(self):
+        """ Read the file names of base; sub-folders not yet known get an empty, unread entry """
+        base = os.path.normpath(self.base)
+        self._mtimes[base] = os.stat(base).st_mtime_ns
+        folders, files = set(), set()
+        with os.scandir(base) as it:
+            for entry in it:
+                if entry.is_dir():
+                    folders.add(os.path.normpath(entry.path))
+                else:
+                    files.add(entry.name)
+        self._entries = {directory: names for directory, names in self._entries.items() if directory in folders}
+        self._entries[base] = files
+        for directory in folders:
+            self._entries.setdefault(directory, set())
+
+    def _read(self, directory):
+        self._mtimes[directory] = os.stat(directory).st_mtime_ns
+        with os.scandir(directory) as sub:
+            self._entries[directory] = {e.name for e in sub}
+
+    def locate(self, name, directories):
+        """ Return the position of the first directory holding `name`, or None """
+        if os.sep in name or (os.altsep and os.altsep in name):
+            # nested links are outside the index: fall back to probing
+            for i, directory in enumerate(directories):
+                if os.path.exists(os.path.join(directory, name)):
+                    return i
+            return None
+
+        for i, directory in enumerate(directories):
+            if name in self._entries.get(os.path.normpath(directory), ()):
+                return i
+        return None
+
+    def has_folder(self, directory):
+        return os.path.normpath(directory) in self._entries
+
+    def add_folder(self, directory):
+        directory = os.path.normpath(directory)
+        self._entries.setdefault(directory, set())
+        self._touch(directory, os.path.dirname(directory))
+
+    def add(self, directory, name):
+        directory = os.path.normpath(directory)
+        self._entries.setdefault(directory, set()).add(name)
+        self._touch(directory)
+
+    def discard(self, directory, name):
+        directory = os.path.normpath(directory)
+        self._entries.get(directory, set()).discard(name)
+        self._touch(directory)
+
+    def _touch(self, *directories):
+        """ Called after the change on disk: a later modification time is someone else's """
+        now = time.time_ns()
+        for directory in directories:
+            self._touched[directory] = now
+
+    def move(self, old, new, name):
+        self.discard(old, name)
+        self.add(new, name)
@@ -0,0 +1,76 @@
+import copy
+import docx
+from lxml import etree
+from docx.oxml import parse_xml
+from docx.oxml.ns import qn
+from docx.text.paragraph import Paragraph
+from docx.text.run import Run
+from row_schema import IMAGE_FIELDS, QCRecord
+
+# Private-use characters delimit the placeholders, so they never clash with sheet values
+_OPEN, _CLOSE = '\ue000', '\ue001'
+
+def _token(field):
+    return f"{_OPEN}{field}{_CLOSE}"
+
+class QCDocTemplate:
+    """
+    Compiled QC layout: the document is built once by the generator's builders
+    with placeholder values, then every row copies it and fills the slots.
+    """
+    def __init__(self, generator, context_class):
+        self.generator = generator
+        self.context_class = context_class
+        self._base = self._compile()
+
+    def __getstate__(self):
+        # python-docx documents do not pickle; ship the document XML to pool workers instead
+        state = self.__dict__.copy()
+        state['_base'] = etree.tostring(self._base_document().element)
+        return state
+
+    def _compile(self):
+        row = QCRecord.filled(_token) # every field holds its own placeholder
+        ctx = self.context_class(self.generator.base, row)
+        ctx.placeholders = True
+        ctx.doc = docx.Document()
+        self.generator._build_document(ctx, row)
+        return ctx.doc
+
+    def _base_document(self):
+        """ The compiled document, rebuilt from its XML after unpickling """
+        if isinstance(self._base, bytes):
+            doc = docx.Document()
+            doc.part._element = parse_xml(self._base)
+            self.generator._add_styles(doc) # styles.xml is a part of its own, not in the document XML
+            self._base = doc.part.document
+        return self._base
+
+    def render(self, ctx, row):
+        """ Return a new document for the row, filled from the compiled layout """
+        base = self._base_document()
+        # Copy the package, but share the parts no row changes (styles.xml alone is
+        # half the cost of a copy). Compact output prunes styles.xml, so it gets its own.
+        copied = {base.part}
+        if self.generator.compact_level is not None:
+            copied.add(base.part._styles_part)
+        memo = {id(part): part for part in base.part.package.iter_parts() if part not in copied}
+        doc = copy.deepcopy(base, memo)
+
+        # collect first: filling the slots mutates the tree
+        slots = [t for t in doc.element.body.iter(qn('w:t'))
+                 if t.text and t.text.startswith(_OPEN) and t.text.endswith(_CLOSE)]
+
+        for t in slots:
+            field = t.text[1:-1]
+            r = t.getparent()
+            p = r.getparent()
+            paragraph = Paragraph(p, doc)
+            if field in IMAGE_FIELDS:
+                p.remove(r)
+                self.generator._process_image(ctx, paragraph, getattr(row, field))
+            elif getattr(row, field) or r.find(qn('w:rPr')) is not None:
+                Run(r, paragraph).text = getattr(row, field)
+            else: # the builders write plain text with add_paragraph(text), which adds no run when blank
+                p.remove(r)
+        return doc
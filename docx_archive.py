@@ -0,0 +1,83 @@
+import json
+import os
+import re
+import zipfile
+
+class DocArchiveWriter:
+    """
+    Streams generated documents from memory into zip archives laid out as
+    <CERN ID>/<filename+ID>.docx, optionally sharded every `shard_size` documents.
+
+    close() writes <name>.index.json mapping every member to its board and archive,
+    then deletes the archives of an earlier run the new index does not list (fewer
+    shards than before, or a switch between sharded and single output).
+    Members are stored uncompressed: a docx is already a deflated zip.
+    """
+    def __init__(self, directory, name, shard_size=None):
+        self.directory = directory
+        self.name = name
+        self.shard_size = shard_size
+        self.index = {}
+        self._zip = None
+        self._archive = None
+        self._shard = 0
+        self._count = 0 # documents in the current shard
+        self.removed = [] # stale archives deleted by close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, f"{self.name}.index.json")
+
+    def add(self, cern_id, gdoc, blob):
+        """ Append one document; returns '<archive>:<member>' """
+        if self._zip is None or (self.shard_size and self._count >= self.shard_size):
+            self._open_shard()
+        member = f"{cern_id}/{gdoc}"
+        self._zip.writestr(zipfile.ZipInfo(member, date_time=(1980, 1, 1, 0, 0, 0)), blob, compress_type=zipfile.ZIP_STORED)
+        self.index[member] = {'ID': cern_id, 'archive': self._archive}
+        self._count += 1
+        return f"{self._archive}:{member}"
+
+    def _open_shard(self):
+        if self._zip is not None:
+            self._zip.close()
+        self._shard += 1
+        self._archive = f"{self.name}-{self._shard:04d}.zip" if self.shard_size else f"{self.name}.zip"
+        self._zip = zipfile.ZipFile(os.path.join(self.directory, self._archive), 'w')
+        self._count = 0
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False, indent=1)
+        self._remove_stale()
+
+    def _remove_stale(self):
+        archives = {entry['archive'] for entry in self.index.values()}
+        pattern = re.compile(re.escape(self.name) + r'(-\d{4,})?\.zip')
+        with os.scandir(self.directory) as it:
+            stale = [entry for entry in it if pattern.fullmatch(entry.name) and entry.name not in archives]
+        for entry in stale:
+            os.remove(entry.path)
+            self.removed.append(entry.name)
+
+def find_documents(index_path, cern_id):
+    """ Return the (archive path, member) pairs of a board's documents """
+    with open(index_path, encoding='utf-8') as f:
+        index = json.load(f)
+    directory = os.path.dirname(index_path)
+    return [(os.path.join(directory, entry['archive']), member)
+            for member, entry in index.items() if entry['ID'] == cern_id]
+
+def read_document(archive_path, member):
+    """ Return the bytes of one archived document """
+    with zipfile.ZipFile(archive_path) as z:
+        return z.read(member)
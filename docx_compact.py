@@ -0,0 +1,122 @@
+import zipfile
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+from docx.oxml.ns import qn
+
+# parts of python-docx's default template that a QC document never uses. Kept on purpose:
+# theme1.xml (docDefaults and the heading styles take their fonts from the theme, e.g.
+# w:asciiTheme="minorHAnsi"; without it Word falls back to Times New Roman) and settings.xml
+# (compatibility mode 14 and the default tab stop; without it Word lays the pages out in
+# an older compatibility mode). numbering.xml goes only when nothing numbers, see
+# strip_unused_numbering.
+UNUSED_RELTYPES = (
+    'http://schemas.microsoft.com/office/2007/relationships/stylesWithEffects', # Word 2010 copy of styles.xml
+    RT.WEB_SETTINGS,
+    RT.CUSTOM_XML,
+    RT.THUMBNAIL,
+)
+
+# already-compressed media: deflating them again costs time and saves nothing
+STORED_TYPES = ('image/jpeg', 'image/png', 'image/gif')
+
+# elements whose w:val names a style
+_STYLE_REFERENCES = tuple(qn(tag) for tag in ('w:pStyle', 'w:rStyle', 'w:tblStyle', 'w:numStyleLink', 'w:styleLink',
+                                               'w:defaultTableStyle', 'w:clickAndTypeStyle'))
+_STYLE_LINKS = tuple(qn(tag) for tag in ('w:basedOn', 'w:next', 'w:link'))
+
+def strip_unused_parts(doc):
+    """ Drop the template parts in UNUSED_RELTYPES; returns their part names """
+    dropped = []
+    for rels in (doc.part.package.rels, doc.part.rels):
+        for rId, rel in list(rels.items()):
+            if rel.reltype in UNUSED_RELTYPES and not rel.is_external:
+                dropped.append(str(rel.target_part.partname))
+                del rels[rId]
+    return dropped
+
+def _styles_in_use(by_id, wanted):
+    """ IDs of the styles in `wanted` and of the styles these are based on, linked to or followed by """
+    keep = set()
+    while wanted:
+        style_id = wanted.pop()
+        if style_id in keep or style_id not in by_id:
+            continue
+        keep.add(style_id)
+        wanted += [e.get(qn('w:val')) for e in by_id[style_id].iter(*_STYLE_LINKS)]
+    return keep
+
+def _style_references(doc, skip=()):
+    """ Style IDs named in the XML parts of the package other than styles.xml and `skip` """
+    skip = (doc.styles.element,) + tuple(skip)
+    names = []
+    for part in doc.part.package.iter_parts():
+        element = getattr(part, '_element', None)
+        if element is not None and element not in skip:
+            names += [e.get(qn('w:val')) for e in element.iter(*_STYLE_REFERENCES)]
+    return names
+
+def strip_unused_numbering(doc):
+    """
+    Drop numbering.xml when no paragraph is numbered, directly (w:numPr) or through a
+    style in use; returns whether it was dropped
+    """
+    rels = doc.part.rels
+    numbering = [rId for rId, rel in rels.items() if rel.reltype == RT.NUMBERING and not rel.is_external]
+    if not numbering:
+        return False
+    numbering_element = rels[numbering[0]].target_part.element
+
+    by_id = {style.styleId: style for style in doc.styles.element.style_lst}
+    wanted = [style.styleId for style in by_id.values() if style.default]
+    in_use = _styles_in_use(by_id, wanted + _style_references(doc, skip=[numbering_element]))
+    elements = [part._element for part in doc.part.package.iter_parts()
+                if getattr(part, '_element', None) is not None
+                and part._element not in (doc.styles.element, numbering_element)]
+    elements += [by_id[style_id] for style_id in in_use]
+    if any(next(element.iter(qn('w:numPr')), None) is not None for element in elements):
+        return False
+    for rId in numbering:
+        del rels[rId]
+    return True
+
+def prune_styles(doc):
+    """
+    Remove the styles nothing refers to; returns how many were removed
+
+    Kept: the default styles, every style named in the other XML parts (document,
+    numbering, ...), and the styles these are based on, linked to or followed by.
+    """
+    styles_element = doc.styles.element
+    by_id = {style.styleId: style for style in styles_element.style_lst}
+    wanted = [style.styleId for style in by_id.values() if style.default]
+    keep = _styles_in_use(by_id, wanted + _style_references(doc))
+    for style_id, style in by_id.items():
+        if style_id not in keep:
+            styles_element.remove(style)
+    return len(by_id) - len(keep)
+
+def compact_document(doc):
+    """ Strip the unused template parts, numbering and styles of a document in place """
+    strip_unused_parts(doc)
+    strip_unused_numbering(doc) # first: styles named only by numbering.xml go with it
+    prune_styles(doc)
+
+def save_compact(doc, target, compresslevel=6):
+    """
+    Write a document like doc.save(target), with XML parts deflated at `compresslevel`
+    (0-9) and JPEG/PNG/GIF media stored as they are
+    """
+    package = doc.part.package
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as z:
+        z.writestr(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+        z.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+        for part in parts:
+            stored = zipfile.ZIP_STORED if part.content_type in STORED_TYPES else None
+            z.writestr(part.partname.membername, part.blob, compress_type=stored)
+            if len(part.rels):
+                z.writestr(part.partname.rels_uri.membername, part.rels.xml)
@@ -0,0 +1,97 @@
+import time
+
+FOLDER_MIME = 'application/vnd.google-apps.folder'
+
+class _Node:
+    def __init__(self, folder_id, expires):
+        self.id = folder_id
+        self.expires = expires
+        self.children = {}
+
+class FolderIdCache:
+    """
+    Path -> folder-ID trie of one shared drive.
+
+    Each resolved path component is kept for `ttl` seconds, so moving thousands of
+    files into the same folders resolves every component with one files.list query
+    at most. warm() fills the whole tree from one paginated listing of its folders.
+    """
+    def __init__(self, drive_id, ttl=600, clock=time.monotonic):
+        self.drive_id = drive_id
+        self.ttl = ttl
+        self.clock = clock
+        self.root = _Node(drive_id, float('inf'))
+
+    def lookup(self, parts):
+        """ Return (folder IDs of the longest cached prefix of `parts`, starting with the drive ID) """
+        ids, node, now = [self.root.id], self.root, self.clock()
+        for part in parts:
+            child = node.children.get(part)
+            if child is None or child.expires < now:
+                node.children.pop(part, None)
+                break
+            ids.append(child.id)
+            node = child
+        return ids
+
+    def insert(self, parts, folder_ids):
+        """ Cache the folder IDs of consecutive path components starting at the drive root """
+        node, expires = self.root, self.clock() + self.ttl
+        for part, folder_id in zip(parts, folder_ids):
+            child = node.children.get(part)
+            if child is None or child.id != folder_id:
+                child = node.children[part] = _Node(folder_id, expires)
+            child.expires = expires
+            node = child
+
+    def invalidate(self, parts=()):
+        """ Forget a path and everything below it (the whole drive by default) """
+        if not parts:
+            self.root.children.clear()
+            return
+        node = self.root
+        for part in parts[:-1]:
+            node = node.children.get(part)
+            if node is None:
+                return
+        node.children.pop(parts[-1], None)
+
+    def warm(self, service, page_size=1000):
+        """ Fill the trie from one paginated listing of every folder in the drive; returns the API calls made """
+        folders, token, calls = {}, None, 0
+        while True:
+            results = service.files().list(
+                q=f"mimeType='{FOLDER_MIME}' and trashed=false",
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                corpora='drive',
+                driveId=self.drive_id,
+                fields='nextPageToken, files(id, name, parents)',
+                pageSize=page_size,
+                pageToken=token
+            ).execute()
+            calls += 1
+            for item in results.get('files', []):
+                folders[item['id']] = (item['name'], (item.get('parents') or [None])[0])
+            token = results.get('nextPageToken')
+            if not token:
+                break
+
+        expires = self.clock() + self.ttl
+        nodes = {self.drive_id: self.root}
+
+        def node_of(folder_id):
+            if folder_id in nodes:
+                return nodes[folder_id]
+            name, parent_id = folders[folder_id]
+            nodes[folder_id] = None # guards against cycles
+            parent = node_of(parent_id) if parent_id in folders or parent_id == self.drive_id else None
+            node = None
+            if parent is not None:
+                node = parent.children[name] = _Node(folder_id, expires)
+            nodes[folder_id] = node
+            return node
+
+        for folder_id in folders:
+            node_of(folder_id)
+        return calls
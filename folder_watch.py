@@ -0,0 +1,91 @@
+import os
+import time
+
+# files written by the generator itself: never a reason to rebuild
+GENERATED_SUFFIXES = ('.docx', '.jsonl', '.json', '.pkl', '.tmp', '.zip', '.links.csv')
+
+def snapshot(base, folders=None):
+    """
+    Map 'name' and 'sub-folder/name' -> (size, mtime_ns) for base and its sub-folders (CERN IDs)
+
+    `folders` (sub-folder name -> (mtime_ns, its entries)) holds the sub-folders read by the
+    previous call and is updated in place: a sub-folder whose modification time did not change
+    is not read again. Files of base are stat'ed on every call (the sheet is exported in place).
+    """
+    folders = {} if folders is None else folders
+    entries, seen = {}, set()
+    with os.scandir(base) as it:
+        for entry in it:
+            if entry.is_dir():
+                seen.add(entry.name)
+                mtime = entry.stat().st_mtime_ns
+                cached = folders.get(entry.name)
+                if cached is None or cached[0] != mtime:
+                    cached = folders[entry.name] = (mtime, _read_folder(entry))
+                entries.update(cached[1])
+            elif not entry.name.endswith(GENERATED_SUFFIXES):
+                stat = entry.stat()
+                entries[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    for name in folders.keys() - seen:
+        del folders[name]
+    return entries
+
+def _read_folder(folder):
+    entries = {}
+    with os.scandir(folder.path) as sub:
+        for e in sub:
+            if e.is_file() and not e.name.endswith(GENERATED_SUFFIXES):
+                stat = e.stat()
+                entries[f"{folder.name}/{e.name}"] = (stat.st_size, stat.st_mtime_ns)
+    return entries
+
+def diff(old, new):
+    """ Paths added, removed or modified between two snapshots """
+    return {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+
+class FolderWatch:
+    """
+    Polls stat snapshots of a base folder and collects the changed paths.
+
+    Changes are released by take() only once the folder has been quiet for
+    `debounce` seconds, so an upload burst or a sheet export in progress is
+    handled as one batch.
+
+    A CERN-ID folder is read again only when its modification time changes, that is when
+    a file in it is added, removed or renamed. A photo rewritten in place inside one (no
+    new name) is therefore not seen; uploads that write a new file are.
+    """
+    def __init__(self, base, debounce=5.0, clock=time.monotonic):
+        self.base = base
+        self.debounce = debounce
+        self.clock = clock
+        self.pending = set()
+        self._folders = {} # sub-folders of the last snapshot, see snapshot()
+        self._snapshot = snapshot(base, self._folders)
+        self._last_change = None
+
+    def poll(self):
+        """ Take a new snapshot; returns the paths changed since the previous one """
+        current = snapshot(self.base, self._folders)
+        changed = diff(self._snapshot, current)
+        self._snapshot = current
+        if changed:
+            self.pending |= changed
+            self._last_change = self.clock()
+        return changed
+
+    def ready(self):
+        return bool(self.pending) and self.clock() - self._last_change >= self.debounce
+
+    def take(self):
+        changes, self.pending = self.pending, set()
+        return changes
+
+    def rebaseline(self, ignore=()):
+        """ Accept the folder as it is now, except for changes to names outside `ignore` (made meanwhile by others) """
+        current = snapshot(self.base, self._folders)
+        meanwhile = {path for path in diff(self._snapshot, current) if os.path.basename(path) not in ignore}
+        self._snapshot = current
+        if meanwhile:
+            self.pending |= meanwhile
+            self._last_change = self.clock()
@@ -2,8 +2,6 @@ import os
 import platform
 import sys
 
-import safe_move as sm
-
 def is_colab():
     """Check if code is running in Google Colab"""
     try:
@@ -39,6 +37,7 @@ def safe_move(drive, path1, path2):
         # Check if we're in Colab and dealing with Google Drive paths
         if is_colab() and (is_gdrive_path(path1) or is_gdrive_path(path2)):
             try:
+                import safe_move as sm # Google client libraries: imported only for Drive moves
                 sm.move_shared_drive_file(drive, path1, path2)
 
             except ImportError:
@@ -64,6 +63,43 @@ def safe_move(drive, path1, path2):
         print(f"Error moving file: {str(e)}")
         return False
 
+def safe_move_many(drive, pairs, **kwargs):
+    """
+    Cross-platform bulk move operation
+
+    Args:
+        pairs (list): (source, destination) paths
+
+    Returns:
+        list: one {'source', 'target', 'ok', 'error'} per pair
+    """
+    if is_colab() and any(is_gdrive_path(p1) or is_gdrive_path(p2) for p1, p2 in pairs):
+        # one authenticated service, batched update calls
+        import safe_move as sm
+        return sm.move_shared_drive_files(drive, pairs, **kwargs)
+
+    results = []
+    for path1, path2 in pairs:
+        result = {'source': path1, 'target': path2, 'ok': False, 'error': None}
+        try:
+            os.replace(path1, path2)
+            result['ok'] = True
+        except Exception as e:
+            result['error'] = str(e)
+        results.append(result)
+    return results
+
+def move_files(drive, pairs, **kwargs):
+    """
+    User-friendly wrapper for bulk file moves
+    """
+    results = safe_move_many(drive, pairs, **kwargs)
+    for result in results:
+        if not result['ok']:
+            print(f"Failed to move {result['source']}: {result['error']}")
+    print(f"- moved {sum(1 for r in results if r['ok'])}/{len(results)} files")
+    return results
+
 def move_file(drive, path1, path2):
     """
     User-friendly wrapper for file moving operations
@@ -72,3 +108,21 @@ def move_file(drive, path1, path2):
         print(f"- moved file from {path1} to {path2}")
     else:
         print("Failed to move file")
+
+def upload_files(drive, items, mover=None, **kwargs):
+    """
+    Upload (folder, name, bytes) items into folders of the shared drive `drive`
+
+    Args:
+        mover: a safe_move.SharedDriveMover (default: the session's authenticated one)
+
+    Returns:
+        list: one {'folder', 'name', 'ok', 'id', 'link', 'error'} per item
+    """
+    import safe_move as sm
+    mover = mover or sm.get_mover()
+    results = mover.upload_files(items, drive, **kwargs)
+    for result in results:
+        if not result['ok']:
+            print(f"Failed to upload {result['name']}: {result['error']}")
+    return results
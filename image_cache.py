@@ -0,0 +1,87 @@
+import hashlib
+import os
+from instrumentation import Instrumentation
+
+class ImageCache:
+    """
+    On-disk cache of photos downsampled to their print size.
+
+    Entries are keyed by the SHA-1 of the source file plus the resize parameters,
+    so re-runs and documents sharing a photo skip the decoding. A source is hashed
+    once per process while its size and mtime stay the same. The least recently
+    used entries are evicted once the cache grows beyond max_bytes.
+    """
+    def __init__(self, cache_dir, dpi=200, quality=85, max_bytes=2 * 1024**3, instrumentation=None):
+        self.cache_dir = cache_dir
+        self.dpi = dpi
+        self.quality = quality
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._total = sum(entry.stat().st_size for entry in os.scandir(self.cache_dir) if entry.is_file())
+        self._warned = False
+        self._hashes = {} # (abspath, size, mtime_ns) -> SHA-1 of the source
+        self.inst = instrumentation # None: the generator using the cache attaches its own
+
+    def get(self, image_path, width):
+        """ Return the path of the image resized to `width` inches (the original if no reduction applies) """
+        try:
+            from PIL import Image, ImageOps
+        except ImportError:
+            if not self._warned:
+                (self.inst or Instrumentation()).info("[Warning] Pillow is not installed: embedding photos at full resolution")
+                self._warned = True
+            return image_path
+
+        key = f"{self._hash(image_path)}-{width}in-{self.dpi}dpi-q{self.quality}"
+        for ext in ('.jpg', '.png'):
+            cached = os.path.join(self.cache_dir, key + ext)
+            if os.path.exists(cached):
+                os.utime(cached) # mark as recently used
+                return cached
+
+        target = int(width * self.dpi)
+        with Image.open(image_path) as img:
+            if img.width <= target:
+                return image_path
+            img = ImageOps.exif_transpose(img)
+            img.thumbnail((target, target * img.height // img.width + 1), Image.LANCZOS)
+
+            has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+            cached = os.path.join(self.cache_dir, key + ('.png' if has_alpha else '.jpg'))
+            tmp = cached + f".{os.getpid()}.tmp"
+            if has_alpha:
+                img.save(tmp, format='PNG', optimize=True, dpi=(self.dpi, self.dpi))
+            else:
+                img.convert('RGB').save(tmp, format='JPEG', quality=self.quality, optimize=True, dpi=(self.dpi, self.dpi))
+
+        os.replace(tmp, cached)
+        self._total += os.path.getsize(cached)
+        self._evict(keep=cached)
+        return cached
+
+    def _hash(self, path):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._hashes.get(key)
+        if digest is None:
+            sha1 = hashlib.sha1()
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha1.update(chunk)
+            digest = self._hashes[key] = sha1.hexdigest()
+        return digest
+
+    def _evict(self, keep):
+        if self._total <= self.max_bytes:
+            return
+
+        entries = [entry for entry in os.scandir(self.cache_dir) if entry.is_file()]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        self._total = sum(entry.stat().st_size for entry in entries)
+        for entry in entries:
+            if self._total <= self.max_bytes:
+                break
+            if entry.path == keep:
+                continue
+            self._total -= entry.stat().st_size
+            os.remove(entry.path)
@@ -0,0 +1,89 @@
+import os
+from collections import OrderedDict
+from docx.image.image import Image
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.shape import CT_Inline
+
+class ImageRegistry:
+    """
+    In-process registry of parsed images shared by every document of a run.
+
+    Only images asked for more than once (logos, photos shared by several boards)
+    are kept: later documents embedding them reuse the same bytes and metadata.
+    Single-use photos are parsed, handed out and forgotten. Files are keyed by path,
+    size and modification time, so a photo replaced under the same name is read
+    again. Held images are bounded by max_bytes, dropping the least recently used
+    ones. hits/misses count the lookups.
+    """
+    def __init__(self, max_bytes=32 * 1024**2):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._bytes = 0
+        self._seen = set() # keys requested once so far
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        # pool workers start with an empty registry of their own
+        state = self.__dict__.copy()
+        state.update(_images=OrderedDict(), _bytes=0, _seen=set(), hits=0, misses=0)
+        return state
+
+    @staticmethod
+    def _key(image_path):
+        stat = os.stat(image_path)
+        return os.path.abspath(image_path), stat.st_size, stat.st_mtime_ns
+
+    def get(self, image_path):
+        """ Return the parsed docx Image of a file, re-reading it only until it is known to be shared """
+        key = self._key(image_path)
+        image = self._images.get(key)
+        if image is None:
+            self.misses += 1
+            image = Image.from_file(image_path)
+            if key not in self._seen:
+                self._seen.add(key)
+                return image
+            self._seen.discard(key)
+            self._images[key] = image
+            self._bytes += len(image.blob)
+            while self._bytes > self.max_bytes and len(self._images) > 1:
+                _, dropped = self._images.popitem(last=False)
+                self._bytes -= len(dropped.blob)
+        else:
+            self.hits += 1
+            self._images.move_to_end(key)
+        return image
+
+    def add_picture(self, run, image_path, width):
+        """ Same as run.add_picture(image_path, width=width), without re-reading a known image """
+        image = self.get(image_path)
+        part = run.part
+        image_parts = part.package.image_parts
+
+        # mirrors StoryPart.new_pic_inline, fed with the registered Image instead of a file
+        image_part = image_parts._get_by_sha1(image.sha1) or image_parts._add_image_part(image)
+        rId = part.relate_to(image_part, RT.IMAGE)
+        cx, cy = image.scaled_dimensions(width, None)
+        inline = CT_Inline.new_pic_inline(part.next_id, rId, image.filename, cx, cy)
+        run._r.add_drawing(inline)
+
+    def discard(self, image_path):
+        """ Forget a file that changed or went away, whatever its size and time were """
+        path = os.path.abspath(image_path)
+        for key in [key for key in self._images if key[0] == path]:
+            self._bytes -= len(self._images.pop(key).blob)
+        self._seen = {key for key in self._seen if key[0] != path}
+
+    def clear(self):
+        self._images.clear()
+        self._seen.clear()
+        self._bytes = 0
+
+    def stats(self):
+        return {
+            'images': len(self._images),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,154 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+class Instrumentation:
+    """
+    Timing spans, counters and progress reporting for the generator.
+
+    Modes:
+        'quiet'   : errors only
+        'summary' : stage headers, a throttled progress bar and the final summary
+        'verbose' : everything, including one line per file (the former behaviour)
+
+    Spans are aggregated by name and, unless trace=False, kept as Chrome trace events
+    for export_trace() (open the JSON in chrome://tracing or Perfetto).
+    """
+    MODES = ('quiet', 'summary', 'verbose')
+
+    def __init__(self, mode='verbose', progress_interval=1.0, max_events=200000, stream=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode {mode!r}, expected one of {self.MODES}")
+        self.mode = mode
+        self.progress_interval = progress_interval
+        self.max_events = max_events
+        self.stream = stream or sys.stdout
+        self.spans = {} # name -> [count, total seconds, max seconds]
+        self.counters = {}
+        self.events = []
+        self._origin = time.perf_counter()
+        self._progress = {} # label -> (start, last print)
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # pool workers report with a fresh instance of their own
+        state = self.__dict__.copy()
+        state.update(spans={}, counters={}, events=[], _progress={}, _lock=None, stream=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.stream = sys.stdout
+        self._lock = threading.Lock()
+
+    #----------------------------------------------------------------------------------------------------
+    # messages
+    #----------------------------------------------------------------------------------------------------
+    def log(self, message):
+        """ Per-file detail, verbose mode only """
+        if self.mode == 'verbose':
+            print(message, file=self.stream)
+
+    def info(self, message):
+        """ Stage headers and summaries """
+        if self.mode != 'quiet':
+            print(message, file=self.stream)
+
+    def error(self, message):
+        self.count('errors')
+        print(f"\033[91m[ERROR] {message}\033[0m", file=self.stream)
+
+    #----------------------------------------------------------------------------------------------------
+    # measurements
+    #----------------------------------------------------------------------------------------------------
+    @contextmanager
+    def span(self, name, trace=True, **args):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._record(name, start, end, trace, args)
+
+    def _record(self, name, start, end, trace, args):
+        duration = end - start
+        with self._lock:
+            stats = self.spans.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            if trace and len(self.events) < self.max_events:
+                self.events.append({
+                    'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                    'ts': (start - self._origin) * 1e6, 'dur': duration * 1e6, 'args': args,
+                })
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def take(self):
+        """ Hand over the spans, counters and trace events recorded so far, starting afresh (see merge) """
+        with self._lock:
+            taken = {'spans': self.spans, 'counters': self.counters, 'events': self.events}
+            self.spans, self.counters, self.events = {}, {}, []
+        return taken
+
+    def merge(self, taken):
+        """ Add measurements handed over by take(), e.g. of a pool worker; their trace events keep its pid """
+        if not taken:
+            return
+        with self._lock:
+            for name, (count, total, longest) in taken['spans'].items():
+                stats = self.spans.setdefault(name, [0, 0.0, 0.0])
+                stats[0] += count
+                stats[1] += total
+                stats[2] = max(stats[2], longest)
+            for name, n in taken['counters'].items():
+                self.counters[name] = self.counters.get(name, 0) + n
+            self.events += taken['events'][:max(0, self.max_events - len(self.events))]
+
+    def progress(self, done, total, label='boards'):
+        """ Progress bar with rate and ETA, redrawn at most every progress_interval seconds """
+        if self.mode != 'summary' or total <= 0:
+            return
+        now = time.perf_counter()
+        start, last = self._progress.setdefault(label, (now, 0.0))
+        if done < total and now - last < self.progress_interval:
+            return
+        self._progress[label] = (start, now)
+
+        rate = done / (now - start) if now > start else 0.0
+        eta = (total - done) / rate if rate else 0.0
+        filled = int(30 * done / total)
+        bar = '#' * filled + '.' * (30 - filled)
+        end = '\n' if done >= total else ''
+        print(f"\r[{bar}] {done}/{total} {label} {rate:.1f} {label}/s ETA {eta:.0f}s", end=end, file=self.stream, flush=True)
+        if done >= total:
+            self._progress.pop(label, None)
+
+    #----------------------------------------------------------------------------------------------------
+    # reports
+    #----------------------------------------------------------------------------------------------------
+    def summary(self):
+        """ Print where wall time went (spans) and the counters """
+        if self.mode == 'quiet':
+            return
+        print("[INFO] timing summary:", file=self.stream)
+        for name, (count, total, longest) in sorted(self.spans.items(), key=lambda item: -item[1][1]):
+            print(f"  {name:<16} {total:9.3f}s  {count:7d} calls  {total / count * 1000:8.2f} ms avg  {longest * 1000:8.2f} ms max",
+                  file=self.stream)
+        if self.counters:
+            print("  " + ", ".join(f"{name} {value}" for name, value in sorted(self.counters.items())), file=self.stream)
+
+    def export_trace(self, path):
+        """ Write the spans as Chrome trace JSON, plus the aggregated statistics """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'traceEvents': self.events,
+                'spans': {name: {'count': c, 'total': t, 'max': m} for name, (c, t, m) in self.spans.items()},
+                'counters': self.counters,
+            }, f)
@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class MoveJournal:
+    """
+    Append-only journal of file moves, grouped in batches.
+
+    Every move is written before the rename happens, so a crash leaves a record of
+    what may have moved. rollback() replays the journal in reverse without probing
+    the sheet: its cost depends on the number of moves, and moves of different files
+    run concurrently. The file is read once; compact() rewrites it with only the
+    moves not undone yet.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.batch = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending = {} # seq -> move not undone yet, in journal order
+        self._committed = set()
+        self._batches = set() # names in use, kept unique
+        self._seq = 0
+        self._load()
+
+    def __getstate__(self):
+        # locks and file handles stay in the process that opened them
+        state = self.__dict__.copy()
+        state.update(_lock=None, _file=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        for entry in self._entries():
+            if entry['op'] == 'move':
+                self._pending[entry['seq']] = entry
+                self._seq = max(self._seq, entry['seq']) # compacted journals have gaps: never reuse a number
+            elif entry['op'] == 'undo':
+                self._pending.pop(entry['seq'], None)
+            elif entry['op'] == 'commit':
+                self._committed.add(entry['batch'])
+            if entry.get('batch') is not None:
+                self._batches.add(entry['batch'])
+
+    def begin(self, name):
+        """ Start a batch; moves recorded until commit() belong to it """
+        batch = f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        self.batch, n = batch, 1
+        while self.batch in self._batches: # two batches within the same second
+            n += 1
+            self.batch = f"{batch}-{n}"
+        self._batches.add(self.batch)
+        self._write({'op': 'begin', 'batch': self.batch})
+        return self.batch
+
+    def commit(self):
+        if self.batch is not None:
+            self._write({'op': 'commit', 'batch': self.batch})
+            self._committed.add(self.batch)
+            self.batch = None
+        self.compact()
+
+    def record(self, src, dst, tag=None):
+        """ Log a move before it is performed """
+        with self._lock:
+            self._seq += 1
+            move = {'op': 'move', 'seq': self._seq, 'batch': self.batch, 'tag': tag, 'src': src, 'dst': dst}
+            self._write_unlocked(move)
+            self._pending[move['seq']] = move
+
+    def pending(self, batches=None, tag=None):
+        """ Moves not undone yet, in journal order (optionally filtered by batch and tag) """
+        with self._lock:
+            moves = list(self._pending.values())
+        return [move for move in moves
+                if (batches is None or move['batch'] in batches)
+                and (tag is None or move['tag'] == tag)]
+
+    def compact(self):
+        """ Rewrite the journal with the moves not undone yet and their batches; fully undone batches go """
+        with self._lock:
+            self._close_unlocked()
+            if not os.path.exists(self.path):
+                return
+            entries, batches = [], []
+            if self.batch is not None:
+                batches.append(self.batch)
+                entries.append({'op': 'begin', 'batch': self.batch})
+            for move in self._pending.values():
+                if move['batch'] is not None and move['batch'] not in batches:
+                    batches.append(move['batch'])
+                    entries.append({'op': 'begin', 'batch': move['batch']})
+                entries.append(move)
+            self._committed &= set(batches)
+            entries += [{'op': 'commit', 'batch': batch} for batch in batches if batch in self._committed]
+
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(tmp, self.path)
+
+    def rollback(self, batches=None, tag=None, workers=8):
+        """
+        Undo the pending moves in reverse order.
+
+        Moves of the same file are undone one after another, different files
+        concurrently. Returns one {'src', 'dst', 'ok', 'error'} per move.
+        """
+        chains = {}
+        for move in reversed(self.pending(batches, tag)):
+            chains.setdefault(os.path.basename(move['src']), []).append(move)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = [result for chain in executor.map(self._undo_chain, chains.values()) for result in chain]
+        self.compact()
+        return results
+
+    def _undo_chain(self, chain):
+        results = []
+        for move in chain:
+            result = {'src': move['src'], 'dst': move['dst'], 'ok': False, 'error': None}
+            try:
+                if os.path.exists(move['dst']) and not os.path.exists(move['src']):
+                    os.rename(move['dst'], move['src'])
+                    result['ok'] = True
+                else:
+                    result['error'] = 'not found at its destination (never moved, or moved since)'
+                with self._lock:
+                    self._write_unlocked({'op': 'undo', 'seq': move['seq']})
+                    self._pending.pop(move['seq'], None)
+            except OSError as e:
+                result['error'] = str(e)
+            results.append(result)
+        return results
+
+    def _entries(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError: # line cut short by a crash
+                    continue
+
+    def _write(self, entry):
+        with self._lock:
+            self._write_unlocked(entry)
+
+    def _write_unlocked(self, entry):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._close_unlocked()
+
+    def _close_unlocked(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
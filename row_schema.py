@@ -0,0 +1,120 @@
+import itertools
+
+# (record attribute, CSV header) of every field read by the document builders, in fingerprint order
+FIELDS = (
+    ('cern_id'             , 'ID'),
+    ('doc_name'            , 'filename+ID'),
+    ('title_page1'         , 'title page1'),
+    ('title_page2'         , 'title page2'),
+    ('p2_id'               , 'p2_ID'),
+    ('user'                , 'User'),
+    ('date'                , 'Date'),
+    ('version'             , 'Version'),
+    ('manufacturer'        , 'Manufacturer'),
+    ('batch'               , 'Batch number'),
+    ('general_comments'    , 'General comments'),
+    ('flatness'            , 'Flatness'),
+    ('comments'            , 'Comments'),
+    ('thickness'           , 'Thickness measurements'),
+    ('plating_bga'         , 'Plating (BGA)'),
+    ('plating_holes'       , 'Plating (Holes)'),
+    ('soldermask'          , 'Soldermask alignment'),
+    ('glue'                , 'Glue problems?'),
+    ('test_coupons'        , 'Test coupons (observations, continuity measurements etc.)'),
+    ('accept'              , 'Accept?'),
+    ('image_link'          , 'image link'),
+    ('p2_general_comments' , 'p2_General comments'),
+    ('p2_flatness'         , 'p2_Flatness'),
+    ('p2_hgcroc_type'      , 'p2_HGCROC type'),
+    ('p2_hgcroc_rotation'  , 'p2_HGCROC rotation'),
+    ('p2_connectors'       , 'p2_Connectors'),
+    ('p2_resistors'        , 'p2_Resistors/capacitors'),
+    ('p2_chip_id'          , 'p2_Chip ID'),
+    ('p2_chip_map_link'    , 'p2_Chip location map link'),
+    ('p2_image_link'       , 'p2_image link'),
+    ('p2_power_on_current' , 'p2_Power-on current'),
+    ('p2_configured_ok'    , 'p2_Configured OK'),
+    ('p2_operating_current', 'p2_Operating current'),
+    ('p2_daq_lines_ok'     , 'p2_DAQ lines OK'),
+)
+
+FIELD_NAMES = tuple(name for name, column in FIELDS)
+DOCUMENT_COLUMNS = tuple(column for name, column in FIELDS)
+COLUMN_OF = dict(FIELDS)
+
+# Fields whose value is a file name looked up next to the CSV (may be blank or absent)
+IMAGE_FIELDS = ('image_link', 'p2_image_link', 'p2_chip_map_link')
+
+# Without these a row cannot be placed at all
+REQUIRED_FIELDS = ('cern_id', 'doc_name')
+
+class SchemaError(ValueError):
+    pass
+
+class QCRecord:
+    """ One sheet row as plain strings, read by attribute (see FIELDS) """
+    __slots__ = FIELD_NAMES
+
+    def __init__(self, *values):
+        for name, value in zip(FIELD_NAMES, values):
+            setattr(self, name, value)
+
+    def __getstate__(self):
+        return self.values()
+
+    def __setstate__(self, values):
+        self.__init__(*values)
+
+    def __repr__(self):
+        return f"QCRecord(cern_id={self.cern_id!r})"
+
+    @classmethod
+    def filled(cls, value_of):
+        """ Record whose every field is value_of(name), e.g. template placeholders """
+        return cls(*(value_of(name) for name in FIELD_NAMES))
+
+    def values(self):
+        return tuple(getattr(self, name) for name in FIELD_NAMES)
+
+    def get(self, name, default=''):
+        return getattr(self, name, default)
+
+def _normalize(value):
+    """ NaN and None become '', everything else its string """
+    if value is None or value != value:
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+class RowSchema:
+    """
+    The builder fields resolved once against the headers of a sheet.
+
+    Every missing column is known before the first row is built: a missing ID or
+    filename+ID raises SchemaError, any other missing field reads as ''.
+    records() turns a DataFrame into QCRecords with normalized string values.
+    """
+    def __init__(self, columns):
+        self.columns = list(columns)
+        present = set(self.columns)
+        self.missing = [column for name, column in FIELDS if column not in present]
+        self._keywords = {} # keyword -> first matching column (or None)
+
+        absent = [column for name, column in FIELDS if name in REQUIRED_FIELDS and column in self.missing]
+        if absent: # report every missing column at once, not one fix-and-rerun at a time
+            blank = [column for column in self.missing if column not in absent]
+            raise SchemaError(f"missing required columns: {', '.join(absent)}"
+                              + (f"; also missing: {', '.join(blank)}" if blank else ""))
+
+    def records(self, df):
+        """ Return one QCRecord per DataFrame row, in order """
+        df = df.loc[:, ~df.columns.duplicated()] # first of any repeated header wins
+        columns = [df[column].tolist() if column in df.columns else itertools.repeat('', len(df))
+                   for column in DOCUMENT_COLUMNS]
+        return [QCRecord(*map(_normalize, values)) for values in zip(*columns)]
+
+    def find_column(self, keyword):
+        """ First column whose name contains `keyword` (case-insensitive); cached per keyword """
+        if keyword not in self._keywords:
+            keyword_lower = keyword.lower()
+            self._keywords[keyword] = next((col for col in self.columns if keyword_lower in col.lower()), None)
+        return self._keywords[keyword]
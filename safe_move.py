@@ -1,49 +1,100 @@
-from google.colab import drive
-from googleapiclient.discovery import build
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
+# google.colab and the Google API client are imported where they are used,
+# so that importing this module stays cheap outside Colab
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import io
 import os
+import random
+import threading
+import time
+
+from drive_cache import FOLDER_MIME, FolderIdCache
+
+DOCX_MIME = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
 
 class SharedDriveMover:
-    def __init__(self):
+    def __init__(self, folder_ttl=600, service=None, media_class=None, clock=time.monotonic):
         # Add shared drive scope
         self.SCOPES = [
             'https://www.googleapis.com/auth/drive',
             'https://www.googleapis.com/auth/drive.file',
             'https://www.googleapis.com/auth/drive.metadata',
         ]
-        self.service = self._authenticate()
+        self._shared_service = service # injected service (e.g. a local fake): shared by all threads, no authentication
+        self.media_class = media_class # MediaIoBaseUpload by default
+        self.service = service or self._authenticate()
+        self.folder_ttl = folder_ttl
+        self.clock = clock # time source of the folder caches' TTL
+        self._drive_ids = {} # shared drive name -> ID
+        self._folder_caches = {} # shared drive ID -> FolderIdCache
+        self._local = threading.local() # per-thread services for concurrent batches
         
     def _authenticate(self):
         """Set up Google Drive API service"""
+        from google.colab import drive
+
         if not os.path.exists('/content/drive'):
             drive.mount('/content/drive')
             
         # Your authentication code here
+        return self._new_service()
+
+    def _new_service(self):
+        from googleapiclient.discovery import build
         return build('drive', 'v3', credentials=self.creds)
+
+    def _thread_service(self):
+        """The HTTP client of a service is not thread-safe: one service per worker thread"""
+        if self._shared_service is not None or threading.current_thread() is threading.main_thread():
+            return self.service
+        if not hasattr(self._local, 'service'):
+            self._local.service = self._new_service()
+        return self._local.service
     
     def _get_shared_drive_id(self, drive_name):
-        """Get the ID of the shared drive"""
-        results = self.service.drives().list(
-            pageSize=50
-        ).execute()
-        
-        for drive_item in results.get('drives', []):
-            if drive_name in drive_item['name']:
-                return drive_item['id']
-        return None
-    
-    def _get_folder_id(self, folder_path, shared_drive_id):
-        """Get folder ID from path in shared drive"""
+        """Get the ID of the shared drive (listed once per mover)"""
+        if drive_name in self._drive_ids:
+            return self._drive_ids[drive_name]
+
+        token = None
+        while True:
+            results = self.service.drives().list(
+                pageSize=50,
+                pageToken=token
+            ).execute()
+
+            for drive_item in results.get('drives', []):
+                if drive_name in drive_item['name']:
+                    self._drive_ids[drive_name] = drive_item['id']
+                    return drive_item['id']
+
+            token = results.get('nextPageToken')
+            if not token:
+                return None
+
+    def _folder_cache(self, shared_drive_id):
+        if shared_drive_id not in self._folder_caches:
+            self._folder_caches[shared_drive_id] = FolderIdCache(shared_drive_id, ttl=self.folder_ttl, clock=self.clock)
+        return self._folder_caches[shared_drive_id]
+
+    def warm_folder_cache(self, shared_drive_name):
+        """Resolve every folder of the shared drive with one paginated listing"""
+        shared_drive_id = self._get_shared_drive_id(shared_drive_name)
+        if not shared_drive_id:
+            raise Exception(f"Could not find shared drive: {shared_drive_name}")
+        return self._folder_cache(shared_drive_id).warm(self.service)
+
+    def _get_folder_id(self, folder_path, shared_drive_id, create=False):
+        """Get folder ID from path in shared drive (creating missing folders if create=True)"""
         clean_path = folder_path.replace('/content/drive/', '')
         path_parts = clean_path.strip('/').split('/')
-        
-        # Start from shared drive root
-        parent_id = shared_drive_id
-        
-        for part in path_parts:
-            query = f"name='{part}' and mimeType='application/vnd.google-apps.folder' and '{parent_id}' in parents"
+
+        # Start from the deepest cached folder (the shared drive root at worst)
+        cache = self._folder_cache(shared_drive_id)
+        folder_ids = cache.lookup(path_parts)
+        parent_id = folder_ids[-1]
+
+        for part in path_parts[len(folder_ids) - 1:]:
+            query = f"name='{part}' and mimeType='{FOLDER_MIME}' and '{parent_id}' in parents"
             results = self.service.files().list(
                 q=query,
                 supportsAllDrives=True,
@@ -55,11 +106,19 @@ class SharedDriveMover:
             ).execute()
             
             items = results.get('files', [])
+            if not items and create:
+                items = [self.service.files().create(
+                    body={'name': part, 'mimeType': FOLDER_MIME, 'parents': [parent_id]},
+                    supportsAllDrives=True,
+                    fields='id'
+                ).execute()]
             if not items:
                 raise Exception(f"Could not find folder: {part}")
             
             parent_id = items[0]['id']
-        
+            folder_ids.append(parent_id)
+
+        cache.insert(path_parts, folder_ids[1:])
         return parent_id
     
     def move_file(self, file_name, source_path, target_path, shared_drive_name):
@@ -114,13 +173,253 @@ class SharedDriveMover:
             print(f"Error moving file: {str(e)}")
             return False
 
+    def move_files(self, pairs, shared_drive_name, batch_size=50, max_workers=4, max_retries=5, warm=False):
+        """
+        Move many files between folders in a shared drive
+
+        Args:
+            pairs (list): (source, target) full file paths
+            shared_drive_name (str): Name of the shared drive
+            batch_size (int): update calls per Drive batch request (at most 100)
+            max_workers (int): batch requests in flight at once
+            max_retries (int): attempts for files throttled with 403/429
+            warm (bool): resolve all folders of the drive with one listing first
+
+        Returns:
+            list: one {'source', 'target', 'ok', 'error'} per pair, in input order
+        """
+        results = [{'source': source, 'target': target, 'ok': False, 'error': None} for source, target in pairs]
+        try:
+            shared_drive_id = self._get_shared_drive_id(shared_drive_name)
+            if not shared_drive_id:
+                raise Exception(f"Could not find shared drive: {shared_drive_name}")
+            if warm:
+                self.warm_folder_cache(shared_drive_name)
+        except Exception as e:
+            for result in results: result['error'] = str(e)
+            return results
+
+        # Resolve folders (cached) and file IDs (one listing per source folder)
+        pending, listings = [], {}
+        for i, (source, target) in enumerate(pairs):
+            try:
+                source_folder_id = self._get_folder_id(os.path.dirname(source), shared_drive_id)
+                target_folder_id = self._get_folder_id(os.path.dirname(target), shared_drive_id)
+                if source_folder_id not in listings:
+                    listings[source_folder_id] = self._list_files(source_folder_id, shared_drive_id)
+                file_id = listings[source_folder_id].get(os.path.basename(source))
+                if file_id is None:
+                    raise Exception(f"Could not find file: {os.path.basename(source)}")
+                pending.append((i, file_id, source_folder_id, target_folder_id))
+            except Exception as e:
+                results[i]['error'] = str(e)
+
+        # Send the updates as batch requests, backing off while Drive throttles
+        throttle = _Throttle()
+        for attempt in range(max_retries + 1):
+            if not pending:
+                break
+            time.sleep(throttle.delay)
+            batches = [pending[k:k + batch_size] for k in range(0, len(pending), batch_size)]
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                outcomes = list(executor.map(lambda batch: self._execute_batch(batch, results), batches))
+            pending = [item for throttled in outcomes for item in throttled]
+            throttle.update(bool(pending)) # once per round, from all its batches
+
+        for i, *_ in pending:
+            results[i]['error'] = 'rate limited: retries exhausted'
+
+        moved = sum(1 for result in results if result['ok'])
+        print(f"Successfully moved {moved}/{len(results)} files")
+        return results
+
+    def _list_files(self, folder_id, shared_drive_id):
+        """Map name -> ID of the files in a folder"""
+        files, token = {}, None
+        while True:
+            response = self.service.files().list(
+                q=f"'{folder_id}' in parents and trashed=false",
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                corpora='drive',
+                driveId=shared_drive_id,
+                fields='nextPageToken, files(id, name)',
+                pageSize=1000,
+                pageToken=token
+            ).execute()
+            for item in response.get('files', []):
+                files.setdefault(item['name'], item['id'])
+            token = response.get('nextPageToken')
+            if not token:
+                return files
+
+    def _execute_batch(self, batch, results):
+        """Run one batch of updates; returns the items throttled by Drive"""
+        service = self._thread_service()
+        throttled = []
+
+        def callback(request_id, response, exception):
+            item = batch[int(request_id)]
+            if exception is None:
+                results[item[0]].update(ok=True, error=None)
+            elif _is_rate_limited(exception):
+                throttled.append(item)
+            else:
+                results[item[0]]['error'] = str(exception)
+
+        request = service.new_batch_http_request(callback=callback)
+        for k, (i, file_id, source_folder_id, target_folder_id) in enumerate(batch):
+            request.add(service.files().update(
+                fileId=file_id,
+                addParents=target_folder_id,
+                removeParents=source_folder_id,
+                supportsAllDrives=True
+            ), request_id=str(k))
+
+        try:
+            request.execute()
+        except Exception as e: # HttpError, told apart by its status like the callback errors
+            if not _is_rate_limited(e):
+                for item in batch: results[item[0]]['error'] = str(e)
+                return []
+            throttled = list(batch)
+        return throttled
+
+    def upload_files(self, items, shared_drive_name, max_workers=4, chunk_size=5 * 1024**2, max_retries=5,
+                     mimetype=DOCX_MIME):
+        """
+        Upload files from memory into folders of a shared drive
+
+        Args:
+            items (iterable): (folder path in the drive, file name, bytes); consumed lazily,
+                so a generator of freshly built documents never has to be held in full
+            shared_drive_name (str): Name of the shared drive
+            max_workers (int): uploads in flight at once (at most 2 x max_workers files are held)
+            chunk_size (int): bytes per resumable-upload request
+            max_retries (int): consecutive failed chunks (403/429 rate limits, 5xx) before giving up on a file
+
+        Missing folders are created. A file already present under the same name is
+        updated in place, so uploading again does not leave duplicates.
+
+        Returns:
+            list: one {'folder', 'name', 'ok', 'id', 'link', 'error'} per item, in input order
+        """
+        shared_drive_id = self._get_shared_drive_id(shared_drive_name)
+        results, running = [], {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for folder, name, blob in items:
+                result = {'folder': folder, 'name': name, 'ok': False, 'id': None, 'link': None, 'error': None}
+                results.append(result)
+                try:
+                    if not shared_drive_id:
+                        raise Exception(f"Could not find shared drive: {shared_drive_name}")
+                    # folders are resolved here, on one thread: concurrent uploads never race to create the same one
+                    folder_id = self._get_folder_id(folder, shared_drive_id, create=True)
+                    file_id = self._list_files(folder_id, shared_drive_id).get(name)
+                except Exception as e:
+                    result['error'] = str(e)
+                    continue
+
+                if len(running) >= 2 * max_workers:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self._upload_done(running.pop(future), future)
+                future = executor.submit(self._upload, folder_id, name, blob, file_id, chunk_size, max_retries, mimetype)
+                running[future] = result
+
+            for future, result in running.items():
+                self._upload_done(result, future)
+
+        uploaded = sum(1 for result in results if result['ok'])
+        print(f"Successfully uploaded {uploaded}/{len(results)} files")
+        return results
+
+    def _upload_done(self, result, future):
+        try:
+            response = future.result()
+        except Exception as e:
+            result['error'] = str(e)
+            return
+        result.update(ok=True, id=response['id'],
+                      link=response.get('webViewLink') or f"https://drive.google.com/file/d/{response['id']}/view")
+
+    def _upload(self, folder_id, name, blob, file_id, chunk_size, max_retries, mimetype):
+        """Resumable upload of one file, resuming after throttled or failed chunks"""
+        media_class = self.media_class
+        if media_class is None:
+            from googleapiclient.http import MediaIoBaseUpload as media_class
+        media = media_class(io.BytesIO(blob), mimetype=mimetype, chunksize=chunk_size, resumable=True)
+
+        service = self._thread_service()
+        if file_id:
+            request = service.files().update(fileId=file_id, media_body=media,
+                                             supportsAllDrives=True, fields='id, webViewLink')
+        else:
+            request = service.files().create(body={'name': name, 'parents': [folder_id]}, media_body=media,
+                                             supportsAllDrives=True, fields='id, webViewLink')
+
+        response, failures = None, 0
+        while response is None:
+            try:
+                _, response = request.next_chunk()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if failures > max_retries or not _is_retryable(e):
+                    raise
+                time.sleep(min(64.0, 2.0 ** (failures - 1)) + random.uniform(0, 1))
+        return response
+
+class _Throttle:
+    """Adaptive delay between batch rounds: doubles after a round with 403/429, halves after a clean one"""
+    def __init__(self, initial=1.0, maximum=64.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = 0.0
+
+    def update(self, throttled):
+        if throttled:
+            self.delay = min(self.maximum, max(self.initial, self.delay * 2)) + random.uniform(0, self.initial)
+        else:
+            self.delay /= 2
+
+def _is_rate_limited(error):
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    if status == 429:
+        return True
+    content = getattr(error, 'content', b'') or b''
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', 'replace')
+    return status == 403 and ('rateLimitExceeded' in content or 'userRateLimitExceeded' in content)
+
+def _is_retryable(error):
+    status = getattr(getattr(error, 'resp', None), 'status', None)
+    return _is_rate_limited(error) or status in (500, 502, 503, 504)
+
+# one authenticated mover (and its ID caches) for the whole session
+_mover = None
+
+def get_mover():
+    global _mover
+    if _mover is None:
+        _mover = SharedDriveMover()
+    return _mover
+
+def move_shared_drive_files(shared_drive_name, pairs, **kwargs):
+    """Move many (source, target) files with one mover; see SharedDriveMover.move_files"""
+    return get_mover().move_files(pairs, shared_drive_name, **kwargs)
+
+def upload_shared_drive_files(shared_drive_name, items, **kwargs):
+    """Upload many (folder, name, bytes) files with one mover; see SharedDriveMover.upload_files"""
+    return get_mover().upload_files(items, shared_drive_name, **kwargs)
+
 # Usage example
 def move_shared_drive_file(shared_drive_name, source, target):
     dir_source = os.path.dirname(source)
     dir_target = os.path.dirname(target)
     file_name = os.path.basename(source)
 
-    mover = SharedDriveMover()
+    mover = get_mover()
     return mover.move_file(
         file_name=file_name,
         source_path=dir_source,
@@ -3,9 +3,20 @@ from setuptools import setup, find_packages
 setup(
     name="tidc_auto_doc",
     version="0.1",
-    packages=find_packages(),
-    py_modules=['gdrive_utils'],
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*', 'tests', 'tests.*']),
+    py_modules=[
+        'autoDocCreater', 'batch_runner', 'build_manifest', 'cli', 'dir_index', 'doc_template', 'docx_archive',
+        'docx_compact', 'drive_cache', 'folder_watch', 'gdrive_utils', 'image_cache', 'image_registry',
+        'instrumentation', 'move_journal', 'row_schema', 'safe_move',
+    ],
     install_requires=[
+        'pandas',
+        # docx_compact, doc_template and image_registry use python-docx internals
+        # (part._element, ImageParts, _ContentTypesItem, _styles_part): re-check before raising the cap
+        'python-docx>=1.1,<1.3',
         'google-colab;platform_system=="Linux"',
     ],
+    entry_points={
+        'console_scripts': ['tidc-autodoc=cli:main'],
+    },
 )
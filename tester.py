@@ -1,4 +1,5 @@
 import os
+import sys
 from autoDocCreater import QualityControlDocGenerator
 
 folder = 'autoDoc'
@@ -12,9 +13,10 @@ print(csv)
 # tester = QualityControlDocGenerator(folder, csv)
 
 tester = QualityControlDocGenerator(target_folder=folder, filename=csv, drive='.', prefix='./')
-tester.create_directories()
-tester.move_photos()
-tester.create_documents()
-tester.move_docx()
+tester.run_pipeline(force='--force' in sys.argv) # create_directories → move_photos → create_documents → move_docx, one board at a time
+
+# all "V3" sheets of the folder at once, on one pool of 4 processes
+# from batch_runner import BatchRunner
+# BatchRunner(folder, match='V3', drive='.', prefix='./', workers=4).run()
 
 # tester.move_back_photos()
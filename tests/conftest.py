@@ -0,0 +1,28 @@
+"""
+Shared fixture: a synthetic tracking sheet and its photos (benchmarks/synthetic.py) in a
+temporary folder, loaded by a quiet QualityControlDocGenerator.
+"""
+import contextlib
+import io
+
+import pytest
+
+from autoDocCreater import QualityControlDocGenerator
+from benchmarks.synthetic import make_sheet
+
+CSV = 'V3-test.csv'
+
+@pytest.fixture
+def make_generator(tmp_path):
+    """ make_generator(boards=4, photo_size=(320, 240), folder='sheet', **options) -> generator over a fresh sheet """
+    def make(boards=4, photo_size=(320, 240), folder='sheet', **options):
+        base = tmp_path / folder
+        make_sheet(str(base), CSV, boards, photo_size=photo_size)
+        options.setdefault('mode', 'quiet')
+        with contextlib.redirect_stdout(io.StringIO()):
+            return QualityControlDocGenerator('', CSV, drive='', prefix=str(base), **options)
+    return make
+
+@pytest.fixture
+def generator(make_generator):
+    return make_generator()
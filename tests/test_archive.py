@@ -0,0 +1,44 @@
+import contextlib
+import io
+import os
+import zipfile
+
+from docx_archive import find_documents, read_document
+
+def _archive(generator, shard_size=None):
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = generator.create_documents_archive(shard_size=shard_size)
+    assert all(result['error'] is None for result in results)
+    return results
+
+def _archives(generator):
+    return sorted(name for name in os.listdir(generator.base) if name.endswith('.zip'))
+
+def test_members_are_laid_out_by_board(generator):
+    results = _archive(generator)
+    assert _archives(generator) == ['V3-test_docx.zip']
+    members = [f"{row.cern_id}/{row.doc_name}.docx" for row in generator.records]
+    assert [result['output'] for result in results] == [f"V3-test_docx.zip:{member}" for member in members]
+    with zipfile.ZipFile(os.path.join(generator.base, 'V3-test_docx.zip')) as z:
+        assert z.namelist() == members
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in z.infolist())
+
+def test_documents_round_trip_through_the_index(generator):
+    _archive(generator, shard_size=3)
+    index_path = os.path.join(generator.base, 'V3-test_docx.index.json')
+    for row in generator.records:
+        [(archive, member)] = find_documents(index_path, row.cern_id)
+        with zipfile.ZipFile(io.BytesIO(read_document(archive, member))) as docx:
+            assert row.cern_id.encode() in docx.read('word/document.xml')
+
+def test_stale_shards_are_removed(make_generator):
+    generator = make_generator(boards=5)
+    _archive(generator, shard_size=2)
+    assert _archives(generator) == ['V3-test_docx-0001.zip', 'V3-test_docx-0002.zip', 'V3-test_docx-0003.zip']
+    _archive(generator, shard_size=3)
+    assert _archives(generator) == ['V3-test_docx-0001.zip', 'V3-test_docx-0002.zip']
+    _archive(generator)
+    assert _archives(generator) == ['V3-test_docx.zip']
+    assert generator.index.locate('V3-test_docx-0001.zip', [generator.base]) is None
+    _archive(generator, shard_size=4)
+    assert _archives(generator) == ['V3-test_docx-0001.zip', 'V3-test_docx-0002.zip']
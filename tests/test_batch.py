@@ -0,0 +1,55 @@
+import contextlib
+import io
+import json
+import os
+
+import pytest
+
+from batch_runner import BatchRunner
+from benchmarks.synthetic import make_sheet
+
+@pytest.fixture
+def runner(tmp_path):
+    """ batch/a (3 boards), batch/b (2), batch/c holding two sheets (2 + 2) and a sheet without an ID column """
+    root = tmp_path / 'batch'
+    make_sheet(str(root / 'a'), 'V3-a.csv', 3, photo_size=(64, 48))
+    make_sheet(str(root / 'b'), 'V3-b.csv', 2, photo_size=(64, 48))
+    make_sheet(str(root / 'c'), 'V3-c1.csv', 2, photo_size=(64, 48))
+    make_sheet(str(root / 'c'), 'V3-c2.csv', 2, photo_size=(64, 48), first_board=2)
+    (root / 'c' / 'V3-broken.csv').write_text('preamble\npreamble\nUser,Comments\nsomeone,no ID\n', encoding='utf-8')
+    with contextlib.redirect_stdout(io.StringIO()):
+        return BatchRunner('batch', drive='', prefix=str(tmp_path), mode='quiet')
+
+def _run(runner, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return runner.run(**options)
+
+def test_sheets_of_one_folder_share_its_index(runner):
+    assert runner.sheets == ['a/V3-a.csv', 'b/V3-b.csv', 'c/V3-broken.csv', 'c/V3-c1.csv', 'c/V3-c2.csv']
+    assert runner.failed_sheets == ['c/V3-broken.csv']
+    a, b, c1, c2 = runner.generators
+    assert c1.index is c2.index
+    assert len({id(a.index), id(b.index), id(c1.index)}) == 3
+
+def test_every_board_of_every_sheet_is_built(runner):
+    report = _run(runner)
+    assert report['totals'] == {'sheets': 5, 'failed_sheets': 1, 'boards': 9,
+                                'rebuilt': 9, 'skipped': 0, 'failed': 0, 'io_errors': 0}
+    assert {'sheet': 'c/V3-broken.csv', 'boards': 0, 'error': 'sheet not loaded'} in report['sheets']
+    with open(runner.report_path, encoding='utf-8') as f:
+        assert json.load(f)['totals'] == report['totals']
+    for generator in runner.generators:
+        for row in generator.records:
+            folder = os.path.join(generator.base, row.cern_id)
+            assert sorted(os.listdir(folder)) == sorted([row.image_link, row.p2_image_link, row.doc_name + '.docx'])
+
+def test_second_run_skips_unchanged_boards(runner):
+    _run(runner, stages=('directories', 'documents'))
+    report = _run(runner, stages=('documents',))
+    assert (report['totals']['rebuilt'], report['totals']['skipped']) == (0, 9)
+    assert [entry.get('skipped') for entry in report['sheets']] == [3, 2, 2, 2, None]
+
+def test_shared_pool_builds_the_same_boards(runner):
+    runner.workers = 2
+    report = _run(runner, stages=('documents',))
+    assert report['totals']['rebuilt'] == 9 and report['totals']['failed'] == 0
@@ -0,0 +1,49 @@
+import contextlib
+import io
+import os
+import shutil
+
+import autoDocCreater
+
+def _build(generator, **options):
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = generator.create_documents(**options)
+    assert all(result['error'] is None for result in results)
+    return [result['skipped'] for result in results]
+
+def test_unchanged_rows_are_skipped(generator):
+    assert _build(generator) == [False] * 4
+    assert _build(generator) == [True] * 4
+    assert _build(generator, force=True) == [False] * 4
+
+def test_edited_row_or_replaced_photo_is_rebuilt(generator):
+    _build(generator)
+    generator.records[1].title_page1 = 'Hexaboard Visual Inspection (redone)'
+    photo = os.path.join(generator.base, generator.records[3].p2_image_link)
+    shutil.copyfile(photo, photo + '.new') # a new file under the old name (photos are hard links of a pool)
+    os.replace(photo + '.new', photo)
+    stat = os.stat(photo)
+    os.utime(photo, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert _build(generator) == [True, False, True, False]
+
+def test_missing_document_is_rebuilt(generator):
+    _build(generator)
+    os.remove(os.path.join(generator.base, generator.records[2].doc_name + '.docx'))
+    stat = os.stat(generator.base) # later than the generator's own saves, even on coarse-grained clocks
+    os.utime(generator.base, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert _build(generator) == [True, True, False, True]
+
+def test_line_cut_short_by_a_crash_is_rebuilt(generator):
+    _build(generator)
+    with open(generator.manifest_path, 'rb') as f:
+        lines = f.read().splitlines(keepends=True)
+    with open(generator.manifest_path, 'wb') as f:
+        f.writelines(lines[:-1])
+        f.write(lines[-1][:len(lines[-1]) // 2]) # the last board's entry, interrupted mid-write
+    assert _build(generator) == [True, True, True, False]
+    assert _build(generator) == [True] * 4 # compacted: the cut line is gone
+
+def test_new_layout_version_rebuilds_everything(generator, monkeypatch):
+    _build(generator)
+    monkeypatch.setattr(autoDocCreater, 'DOC_LAYOUT_VERSION', autoDocCreater.DOC_LAYOUT_VERSION + 1)
+    assert _build(generator) == [False] * 4
@@ -0,0 +1,43 @@
+import io
+import zipfile
+
+import docx
+from docx.oxml.ns import qn
+
+from docx_compact import compact_document, save_compact
+
+def _blobs(generator, compact_level):
+    generator.compact_level = compact_level
+    blobs = []
+    for row in generator.records:
+        stream = io.BytesIO()
+        generator._create_quality_control_doc(row, stream=stream)
+        blobs.append(stream.getvalue())
+    return blobs
+
+def test_compact_documents_keep_content(generator):
+    """ same document.xml and media as python-docx's save, every referenced style defined, less bytes """
+    for default, compact in zip(_blobs(generator, None), _blobs(generator, 6)):
+        with zipfile.ZipFile(io.BytesIO(default)) as a, zipfile.ZipFile(io.BytesIO(compact)) as b:
+            assert a.read('word/document.xml') == b.read('word/document.xml')
+            media = sorted(name for name in a.namelist() if name.startswith('word/media/'))
+            assert media == sorted(name for name in b.namelist() if name.startswith('word/media/'))
+            assert all(a.read(name) == b.read(name) for name in media)
+            assert 'word/numbering.xml' not in b.namelist()
+            assert {'word/theme/theme1.xml', 'word/settings.xml'} <= set(b.namelist())
+        doc = docx.Document(io.BytesIO(compact))
+        defined = {style.style_id for style in doc.styles}
+        used = {e.get(qn('w:val')) for e in doc.element.iter(qn('w:pStyle'), qn('w:rStyle'), qn('w:tblStyle'))}
+        assert used <= defined
+        assert len(compact) < len(default)
+
+def test_numbering_kept_for_numbered_paragraphs():
+    doc = docx.Document()
+    doc.add_paragraph('first', style='List Number')
+    compact_document(doc)
+    stream = io.BytesIO()
+    save_compact(doc, stream)
+    doc = docx.Document(stream)
+    assert 'ListNumber' in {style.style_id for style in doc.styles}
+    with zipfile.ZipFile(stream) as z:
+        assert 'word/numbering.xml' in z.namelist()
@@ -0,0 +1,67 @@
+import contextlib
+import io
+import os
+from unittest import mock
+
+import pandas as pd
+
+from autoDocCreater import QualityControlDocGenerator
+
+def test_chunked_load_streams_the_same_records(make_generator):
+    whole = make_generator(boards=7, folder='whole')
+    chunked = make_generator(boards=7, folder='chunked', csv_chunksize=3)
+    assert [row.values() for row in chunked.records] == [row.values() for row in whole.records]
+    assert len(whole.df) == 7
+    assert len(chunked.df) == 0 # only the header is kept: rows are read 3 at a time into records
+    assert list(chunked.df.columns) == list(whole.df.columns)
+
+def _reload(generator, **options):
+    """ a second generator over the same sheet, counting the CSV parses """
+    parses = []
+    read_csv = pd.read_csv
+    def counted(*args, **kwargs):
+        parses.append(args[0])
+        return read_csv(*args, **kwargs)
+    with mock.patch('pandas.read_csv', counted), contextlib.redirect_stdout(io.StringIO()):
+        clone = QualityControlDocGenerator('', generator.filename, drive='', prefix=generator.base, mode='quiet',
+                                           csv_cache=generator.csv_cache and os.path.dirname(generator.csv_cache), **options)
+    return clone, len(parses)
+
+def test_csv_cache_hit_and_miss(make_generator, tmp_path):
+    generator = make_generator(boards=5, csv_cache=str(tmp_path / 'cache'))
+    assert os.path.dirname(generator.csv_cache) == str(tmp_path / 'cache') # not in the shared sheet folder
+    assert os.path.exists(generator.csv_cache)
+    assert not [name for name in os.listdir(generator.base) if name.endswith('.pkl')]
+
+    clone, parses = _reload(generator)
+    assert parses == 0
+    assert clone.df.equals(generator.df)
+    assert [row.values() for row in clone.records] == [row.values() for row in generator.records]
+
+def test_csv_cache_is_invalidated_by_size_or_mtime(make_generator, tmp_path):
+    generator = make_generator(boards=5, csv_cache=str(tmp_path / 'cache'))
+    stat = os.stat(generator.csv)
+    os.utime(generator.csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    _, parses = _reload(generator)
+    assert parses == 1
+
+    with open(generator.csv, 'rb') as f:
+        rows = f.read().splitlines(keepends=True)
+    with open(generator.csv, 'wb') as f:
+        f.writelines(rows[:-1]) # one board fewer, written back with the same mtime
+    os.utime(generator.csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    clone, parses = _reload(generator)
+    assert parses == 1
+    assert len(clone.records) == 4
+
+def test_csv_cache_keeps_used_columns_apart(make_generator, tmp_path):
+    generator = make_generator(boards=5, csv_cache=str(tmp_path / 'cache'))
+    used, parses = _reload(generator, csv_columns='used')
+    assert parses == 1 # cached with every column: parsed again
+    assert set(used.df.columns) == set(QualityControlDocGenerator.DOCUMENT_COLUMNS) | {'User'}
+    assert set(used.df.columns) < set(generator.df.columns)
+    assert [row.values() for row in used.records] == [row.values() for row in generator.records]
+
+    again, parses = _reload(generator, csv_columns='used')
+    assert parses == 0
+    assert again.df.equals(used.df)
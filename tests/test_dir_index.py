@@ -0,0 +1,59 @@
+import os
+
+from dir_index import DirectoryIndex
+
+def _touch(path):
+    with open(path, 'w'):
+        pass
+
+def _bump(directory):
+    """ make sure the directory's mtime differs from the one read, even on coarse-grained clocks """
+    stat = os.stat(directory)
+    os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+def test_sync_rereads_changed_directories_only(tmp_path):
+    base = tmp_path / 'base'
+    for board in ('A', 'B'):
+        (base / board).mkdir(parents=True)
+    _touch(base / 'photo.jpg')
+    index = DirectoryIndex(str(base))
+    assert index.sync() == 0
+
+    _touch(base / 'A' / 'late.jpg')
+    _bump(base / 'A')
+    assert index.locate('late.jpg', [str(base / 'A')]) is None # a snapshot until synced
+    assert index.sync() == 1
+    assert index.locate('late.jpg', [str(base / 'A')]) == 0
+
+def test_sync_follows_new_and_removed_folders(tmp_path):
+    base = tmp_path / 'base'
+    (base / 'A').mkdir(parents=True)
+    index = DirectoryIndex(str(base))
+
+    (base / 'C').mkdir()
+    _touch(base / 'C' / 'doc.docx')
+    os.rmdir(base / 'A')
+    _touch(base / 'uploaded.jpg')
+    _bump(base)
+    index.sync()
+    assert index.has_folder(str(base / 'C')) and not index.has_folder(str(base / 'A'))
+    assert index.locate('doc.docx', [str(base), str(base / 'C')]) == 1
+    assert index.locate('uploaded.jpg', [str(base)]) == 0
+
+def test_sync_trusts_changes_made_through_the_index(tmp_path):
+    base = tmp_path / 'base'
+    base.mkdir()
+    _touch(base / 'photo.jpg')
+    index = DirectoryIndex(str(base))
+
+    os.mkdir(base / 'A')
+    index.add_folder(str(base / 'A'))
+    os.rename(base / 'photo.jpg', base / 'A' / 'photo.jpg')
+    index.move(str(base), str(base / 'A'), 'photo.jpg')
+    assert index.sync() == 0 # the generator's own changes: no directory re-read
+    assert index.locate('photo.jpg', [str(base), str(base / 'A')]) == 1
+
+    _touch(base / 'A' / 'late.jpg')
+    _bump(base / 'A')
+    assert index.sync() == 1 # a later outside change is read again
+    assert index.locate('late.jpg', [str(base / 'A')]) == 0
@@ -0,0 +1,57 @@
+from benchmarks.fake_drive import FakeDriveService, FakeMedia
+from drive_cache import FolderIdCache
+from safe_move import SharedDriveMover
+
+FOLDERS = ['autoDoc/320XHF1TCV00000/photos', 'autoDoc/320XHF1TCV00001/photos', 'autoDoc/320XHF1TCV00002']
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _drive():
+    """ a fake drive holding FOLDERS, and a fresh mover (cold folder cache) on a clock of its own """
+    service = FakeDriveService('HGCAL')
+    setup = SharedDriveMover(service=service, media_class=FakeMedia)
+    drive_id = setup._get_shared_drive_id('HGCAL')
+    for folder in FOLDERS:
+        setup._get_folder_id(folder, drive_id, create=True)
+    clock = _Clock()
+    mover = SharedDriveMover(folder_ttl=600, service=service, media_class=FakeMedia, clock=clock)
+    service.calls.clear()
+    return service, mover, drive_id, clock
+
+def _lookups(service, mover, drive_id, folder):
+    before = service.calls.get('files.list', 0)
+    mover._get_folder_id(folder, drive_id)
+    return service.calls.get('files.list', 0) - before
+
+def test_cold_then_warm_lookup():
+    service, mover, drive_id, _ = _drive()
+    assert _lookups(service, mover, drive_id, FOLDERS[0]) == 3 # one query per path component
+    assert _lookups(service, mover, drive_id, FOLDERS[0]) == 0
+    assert _lookups(service, mover, drive_id, FOLDERS[1]) == 2 # autoDoc is cached
+    assert _lookups(service, mover, drive_id, FOLDERS[2]) == 1
+
+def test_lookup_after_ttl_expiry():
+    service, mover, drive_id, clock = _drive()
+    _lookups(service, mover, drive_id, FOLDERS[0])
+    clock.now = 599.0
+    assert _lookups(service, mover, drive_id, FOLDERS[0]) == 0
+    clock.now = 1200.0 # the lookup at 599 refreshed nothing: entries expire 600 s after insertion
+    assert _lookups(service, mover, drive_id, FOLDERS[0]) == 3
+
+def test_warm_lists_every_folder_once():
+    service, mover, _, _ = _drive()
+    assert mover.warm_folder_cache('HGCAL') == 1
+    assert service.calls == {'drives.list': 1, 'files.list': 1}
+    drive_id = mover._get_shared_drive_id('HGCAL')
+    assert sum(_lookups(service, mover, drive_id, folder) for folder in FOLDERS) == 0
+
+def test_warm_pages_through_the_listing():
+    service, _, drive_id, clock = _drive()
+    cache = FolderIdCache(drive_id, clock=clock)
+    assert cache.warm(service, page_size=2) == 3 # autoDoc, 3 boards and 2 photo folders
+    assert service.calls == {'files.list': 3}
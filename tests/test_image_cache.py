@@ -0,0 +1,62 @@
+import hashlib
+import os
+import random
+from unittest import mock
+
+from PIL import Image
+
+from image_cache import ImageCache
+
+def _photo(path, size, mode='RGB', seed=0):
+    rng = random.Random(seed)
+    Image.frombytes(mode, size, rng.randbytes(size[0] * size[1] * len(mode))).save(path)
+    return str(path)
+
+def _age(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns - seconds * 10**9))
+
+def test_photo_is_resized_to_its_print_width(tmp_path):
+    cache = ImageCache(str(tmp_path / 'cache'), dpi=100)
+    cached = cache.get(_photo(tmp_path / 'photo.jpg', (800, 600)), 2)
+    assert cached.endswith('.jpg') and os.path.dirname(cached) == str(tmp_path / 'cache')
+    with Image.open(cached) as img:
+        assert (img.format, img.width) == ('JPEG', 200)
+        assert abs(img.height - 150) <= 1
+
+    small = _photo(tmp_path / 'small.jpg', (150, 100))
+    assert cache.get(small, 2) == small # already below the print size
+
+def test_transparent_images_stay_png(tmp_path):
+    cache = ImageCache(str(tmp_path / 'cache'), dpi=100)
+    cached = cache.get(_photo(tmp_path / 'map.png', (800, 600), mode='RGBA'), 2)
+    with Image.open(cached) as img:
+        assert cached.endswith('.png') and (img.format, img.mode) == ('PNG', 'RGBA')
+    opaque = cache.get(_photo(tmp_path / 'opaque.png', (800, 600)), 2)
+    assert opaque.endswith('.jpg') # no alpha: stored as JPEG
+
+def test_source_is_hashed_again_only_once_changed(tmp_path):
+    cache = ImageCache(str(tmp_path / 'cache'), dpi=100)
+    photo = _photo(tmp_path / 'photo.jpg', (800, 600))
+    with mock.patch('hashlib.sha1', wraps=hashlib.sha1) as sha1:
+        first = cache.get(photo, 2)
+        assert cache.get(photo, 2) == first
+        assert sha1.call_count == 1
+
+        _photo(photo, (800, 600), seed=1) # rewritten in place: new size or mtime
+        _age(photo, -10)
+        assert cache.get(photo, 2) != first
+        assert sha1.call_count == 2
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    photos = [_photo(tmp_path / f'{name}.jpg', (800, 600), seed=seed) for seed, name in enumerate('abc')]
+    cache = ImageCache(str(tmp_path / 'cache'), dpi=100)
+    a, b = (cache.get(photo, 2) for photo in photos[:2])
+    _age(a, 20)
+    _age(b, 10)
+
+    # room for about two entries (noise photos of one size compress to nearly the same size)
+    cache = ImageCache(str(tmp_path / 'cache'), dpi=100, max_bytes=int(2.5 * os.path.getsize(a)))
+    assert cache.get(photos[0], 2) == a # a hit marks a as recently used
+    c = cache.get(photos[2], 2)
+    assert sorted(os.listdir(tmp_path / 'cache')) == sorted(os.path.basename(path) for path in (a, c))
@@ -0,0 +1,37 @@
+import os
+
+from PIL import Image as PILImage
+
+from image_registry import ImageRegistry
+
+def _photo(path, size=(64, 48), color='red'):
+    PILImage.new('RGB', size, color).save(path, 'JPEG')
+    return str(path)
+
+def test_only_shared_images_are_kept(tmp_path):
+    registry = ImageRegistry()
+    single, shared = _photo(tmp_path / 'single.jpg'), _photo(tmp_path / 'shared.jpg', color='blue')
+    registry.get(single)
+    registry.get(shared)
+    registry.get(shared)
+    assert registry.get(shared) is registry.get(shared)
+    assert registry.stats()['images'] == 1
+    assert registry.stats()['bytes'] == os.path.getsize(shared)
+
+def test_replaced_file_is_read_again(tmp_path):
+    registry = ImageRegistry()
+    path = _photo(tmp_path / 'photo.jpg')
+    registry.get(path)
+    old = registry.get(path)
+    _photo(tmp_path / 'photo.jpg', size=(80, 60), color='green')
+    new = registry.get(path)
+    assert new.blob != old.blob
+    assert (new.px_width, new.px_height) == (80, 60)
+
+def test_held_bytes_stay_under_the_cap(tmp_path):
+    paths = [_photo(tmp_path / f'{i}.jpg', size=(200, 150), color=(i * 20, 0, 0)) for i in range(8)]
+    registry = ImageRegistry(max_bytes=3 * os.path.getsize(paths[0]))
+    for path in paths * 2:
+        registry.get(path)
+    assert registry.stats()['bytes'] <= registry.max_bytes
+    assert registry.stats()['images'] >= 1
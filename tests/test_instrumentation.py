@@ -0,0 +1,35 @@
+import io
+import os
+import sys
+
+from image_cache import ImageCache
+from instrumentation import Instrumentation
+
+def test_pool_worker_timings_reach_the_parent(make_generator):
+    generator = make_generator(boards=5)
+    generator.create_documents(workers=2, force=True)
+    assert generator.inst.spans['doc_build'][0] == 5
+    assert generator.inst.counters['documents'] == 5
+    assert os.getpid() not in {event['pid'] for event in generator.inst.events if event['name'] == 'doc_build'}
+
+def test_merge_adds_up_spans_and_counters():
+    worker, parent = Instrumentation('quiet'), Instrumentation('quiet')
+    for inst in (worker, parent):
+        with inst.span('doc_save'):
+            pass
+        inst.count('documents')
+    parent.merge(worker.take())
+    assert parent.spans['doc_save'][0] == 2
+    assert parent.counters == {'documents': 2}
+    assert len(parent.events) == 2
+    assert worker.spans == {} and worker.events == []
+
+def test_missing_pillow_warns_through_instrumentation(tmp_path, monkeypatch, make_generator):
+    monkeypatch.setitem(sys.modules, 'PIL', None) # import PIL raises ImportError
+    stream = io.StringIO()
+    cache = ImageCache(str(tmp_path / 'cache'))
+    generator = make_generator(boards=1, image_cache=cache, instrumentation=Instrumentation('summary', stream=stream))
+    assert cache.inst is generator.inst
+    assert cache.get(__file__, 3.0) == __file__
+    assert cache.get(__file__, 3.0) == __file__
+    assert stream.getvalue().count("Pillow is not installed") == 1
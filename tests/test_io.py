@@ -0,0 +1,43 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+from benchmarks.bench_io import slow_filesystem
+
+STAGES = ('create_directories', 'move_photos', 'move_docx')
+
+def _with_documents(generator):
+    """ a placeholder docx per board in base, as create_documents leaves them """
+    for row in generator.records:
+        with open(os.path.join(generator.base, row.doc_name + '.docx'), 'wb'):
+            pass
+    generator.index.refresh()
+    return generator
+
+def _run(generator, workers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return {stage: getattr(generator, stage)(workers=workers) for stage in STAGES}
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_every_board_ends_up_in_its_folder(make_generator, workers):
+    generator = _with_documents(make_generator(boards=12, photo_size=(64, 48)))
+    with slow_filesystem(0.001):
+        results = _run(generator, workers)
+    assert [result['error'] for stage in STAGES for result in results[stage]] == [None] * 3 * len(generator.records)
+    for row in generator.records:
+        for name in (row.image_link, row.p2_image_link, row.doc_name + '.docx'):
+            assert os.path.exists(os.path.join(generator.base, row.cern_id, name))
+
+def test_rows_sharing_a_photo_move_it_once(make_generator):
+    """ two boards linking the same photo: the first one in CSV order gets it, as in a serial run """
+    generator = _with_documents(make_generator(boards=12, photo_size=(64, 48)))
+    shared = generator.records[2].image_link
+    for row in generator.records[5::3]:
+        row.image_link = shared
+    with slow_filesystem(0.001):
+        results = _run(generator, 8)
+    assert all(result['error'] is None for stage in STAGES for result in results[stage])
+    assert os.path.exists(os.path.join(generator.base, generator.records[2].cern_id, shared))
+    assert generator._io_chains('photos')[2] == [2, 5, 8, 11]
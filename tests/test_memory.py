@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import pytest
+
+import autoDocCreater
+from autoDocCreater import _pool_results
+from benchmarks.bench_memory import CSV, peak
+from benchmarks.synthetic import make_sheet
+
+BUDGET = 256 * 1024**2
+ROW_BYTES = 16 * 1024 # allowance per extra row: one QCRecord plus its manifest and result entries
+
+def test_bounded_peak_stays_flat(tmp_path):
+    """ with a memory budget, 4x the boards must not raise the peak beyond the records of the extra rows """
+    peaks = {}
+    for boards in (4, 16):
+        folder = str(tmp_path / f'boards_{boards}')
+        make_sheet(folder, CSV, boards, photo_size=(1000, 750))
+        peaks[boards] = peak(folder, BUDGET)
+    assert peaks[16] <= peaks[4] * 1.25 + 12 * ROW_BYTES
+
+@pytest.mark.parametrize('ordered', [False, True])
+def test_pool_window_bounds_submitted_tasks(ordered):
+    """ tasks are submitted as results are taken, never more than `window` ahead; ordered=True keeps task order """
+    submitted, taken = [], []
+    with ThreadPoolExecutor(max_workers=8) as executor, \
+         mock.patch.object(autoDocCreater, '_build_row_task', lambda value: value * 2):
+        submit = executor.submit
+        def counted(function, task):
+            submitted.append(task)
+            assert len(submitted) - len(taken) <= 3
+            return submit(function, task)
+        executor.submit = counted
+        for task, result in _pool_results(executor, iter(range(50)), 3, ordered=ordered):
+            assert result == task * 2
+            taken.append(task)
+    assert (taken if ordered else sorted(taken)) == list(range(50))
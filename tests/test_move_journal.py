@@ -0,0 +1,113 @@
+import json
+import os
+
+from move_journal import MoveJournal
+
+def _file(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w'):
+        pass
+    return str(path)
+
+def _move(journal, src, dst, tag=None):
+    journal.record(src, dst, tag)
+    os.rename(src, dst)
+
+def _lines(journal):
+    with open(journal.path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def test_record_then_rollback(tmp_path):
+    journal = MoveJournal(str(tmp_path / 'V3.moves.jsonl'))
+    src = _file(tmp_path / 'photo.jpg')
+    dst = str(tmp_path / 'A' / 'photo.jpg')
+    os.makedirs(tmp_path / 'A')
+    journal.begin('photos')
+    _move(journal, src, dst, 'photo')
+    journal.commit()
+    assert journal._file is None # no handle left open between batches
+
+    results = journal.rollback()
+    assert [result['ok'] for result in results] == [True]
+    assert os.path.exists(src) and not os.path.exists(dst)
+    assert journal.pending() == [] and journal._file is None
+    assert _lines(journal) == [] # a fully undone batch is compacted away
+
+def test_crash_between_record_and_rename(tmp_path):
+    path = str(tmp_path / 'V3.moves.jsonl')
+    journal = MoveJournal(path)
+    src = _file(tmp_path / 'photo.jpg')
+    journal.begin('photos')
+    journal.record(src, str(tmp_path / 'A' / 'photo.jpg'), 'photo') # the process dies before os.rename
+    journal.close()
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"op": "move", "seq": 2, "ba') # and the next line was cut short
+    restarted = MoveJournal(path)
+    assert len(restarted.pending()) == 1
+    results = restarted.rollback()
+    assert not results[0]['ok'] and 'never moved' in results[0]['error']
+    assert os.path.exists(src)
+    assert restarted.pending() == []
+
+def test_two_moves_of_one_file_undone_in_order(tmp_path):
+    journal = MoveJournal(str(tmp_path / 'V3.moves.jsonl'))
+    for folder in ('A', 'B'):
+        os.makedirs(tmp_path / folder)
+    first = _file(tmp_path / 'doc.docx')
+    journal.begin('docx')
+    _move(journal, first, str(tmp_path / 'A' / 'doc.docx'), 'docx')
+    _move(journal, str(tmp_path / 'A' / 'doc.docx'), str(tmp_path / 'B' / 'doc.docx'), 'docx')
+    journal.commit()
+
+    assert all(result['ok'] for result in journal.rollback())
+    assert os.listdir(tmp_path / 'A') == [] and os.listdir(tmp_path / 'B') == []
+    assert os.path.exists(first)
+
+def test_rollback_filtered_by_batch_and_tag(tmp_path):
+    path = str(tmp_path / 'V3.moves.jsonl')
+    journal = MoveJournal(path)
+    os.makedirs(tmp_path / 'A')
+    moved = {}
+    for name, tag in (('photo.jpg', 'photo'), ('doc.docx', 'docx')):
+        batch = journal.begin(tag)
+        src = _file(tmp_path / name)
+        _move(journal, src, str(tmp_path / 'A' / name), tag)
+        journal.commit()
+        moved[tag] = (batch, src)
+
+    assert [move['tag'] for move in journal.pending(batches=[moved['docx'][0]])] == ['docx']
+    assert [move['tag'] for move in journal.pending(tag='photo')] == ['photo']
+
+    journal.rollback(tag='photo')
+    assert os.path.exists(moved['photo'][1]) and not os.path.exists(moved['docx'][1])
+    journal.rollback(batches=[moved['docx'][0]])
+    assert os.path.exists(moved['docx'][1])
+
+def test_compact_keeps_pending_moves_and_numbering(tmp_path):
+    path = str(tmp_path / 'V3.moves.jsonl')
+    journal = MoveJournal(path)
+    os.makedirs(tmp_path / 'A')
+    batches = []
+    for name in ('a.jpg', 'b.jpg'):
+        batches.append(journal.begin('photos'))
+        _move(journal, _file(tmp_path / name), str(tmp_path / 'A' / name), 'photo')
+        journal.commit()
+    journal.rollback(batches=batches[:1])
+
+    assert [entry['op'] for entry in _lines(journal)] == ['begin', 'move', 'commit']
+    reopened = MoveJournal(path)
+    assert [move['src'] for move in reopened.pending()] == [str(tmp_path / 'b.jpg')]
+    reopened.record('x', 'y')
+    assert reopened.pending()[-1]['seq'] == 3 # numbers of compacted moves are not reused
+    reopened.close()
+
+def test_generator_moves_photos_back(make_generator):
+    generator = make_generator(boards=3, photo_size=(64, 48))
+    generator.create_directories()
+    generator.move_photos()
+    assert all(os.path.exists(os.path.join(generator.base, row.cern_id, row.image_link)) for row in generator.records)
+    results = generator.move_back_photos()
+    assert len(results) == 6 and all(result['ok'] for result in results)
+    assert all(os.path.exists(os.path.join(generator.base, row.image_link)) for row in generator.records)
+    assert generator.journal.pending() == []
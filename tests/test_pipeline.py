@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+def _folder(generator, row):
+    return os.path.join(generator.base, row.cern_id)
+
+def test_stage_subset_runs_in_pipeline_order(generator, monkeypatch):
+    calls = []
+    run_stage = generator._run_stage
+    def recorded(stage, ctx, *args):
+        calls.append((ctx.cernID, stage))
+        return run_stage(stage, ctx, *args)
+    monkeypatch.setattr(generator, '_run_stage', recorded)
+
+    report = generator.run_pipeline(stages=('photos', 'directories'))
+    assert list(report['timings']) == ['directories', 'photos']
+    assert calls == [(row.cern_id, stage) for row in generator.records for stage in ('directories', 'photos')]
+    for row in generator.records:
+        assert sorted(os.listdir(_folder(generator, row))) == sorted([row.image_link, row.p2_image_link])
+    assert not [name for name in os.listdir(generator.base) if name.endswith('.docx')]
+
+def test_unknown_stage_is_rejected(generator):
+    with pytest.raises(ValueError, match='upload'):
+        generator.run_pipeline(stages=('documents', 'upload'))
+
+def test_error_stops_only_its_own_board(generator):
+    blocked = generator.records[1]
+    with open(_folder(generator, blocked), 'w'): # a file where the board's folder goes
+        pass
+
+    results = generator.run_pipeline()['results']
+    assert [result['ID'] for result in results] == [row.cern_id for row in generator.records]
+    assert results[1]['error'].startswith('directories: FileExistsError')
+    assert all(result['error'] is None for position, result in enumerate(results) if position != 1)
+    for row in generator.records:
+        if row is not blocked:
+            assert sorted(os.listdir(_folder(generator, row))) == sorted([row.image_link, row.p2_image_link, row.doc_name + '.docx'])
+    # the blocked board stopped before its later stages
+    for name in (blocked.image_link, blocked.p2_image_link):
+        assert os.path.exists(os.path.join(generator.base, name))
+    assert not os.path.exists(os.path.join(generator.base, blocked.doc_name + '.docx'))
@@ -0,0 +1,28 @@
+import contextlib
+import io
+import os
+import zipfile
+
+def _build(generator, workers):
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = generator.create_documents(workers=workers, force=True)
+    documents = {}
+    for result in results:
+        if result['error'] is None:
+            with zipfile.ZipFile(result['output']) as z:
+                documents[result['ID']] = z.read('word/document.xml')
+    return results, documents
+
+def test_pool_output_matches_serial_in_csv_order(make_generator):
+    generator = make_generator(boards=6)
+    broken = os.path.join(generator.base, generator.records[2].image_link)
+    os.remove(broken) # photos are hard links of a pool: replace, do not overwrite
+    with open(broken, 'wb') as f:
+        f.write(b'not a photo')
+
+    serial, expected = _build(generator, 1)
+    pooled, documents = _build(generator, 2)
+    assert [result['ID'] for result in pooled] == [row.cern_id for row in generator.records]
+    assert [result['error'] is not None for result in pooled] == [False, False, True, False, False, False]
+    assert [result['error'] for result in pooled] == [result['error'] for result in serial]
+    assert documents == expected
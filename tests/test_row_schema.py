@@ -0,0 +1,44 @@
+import io
+
+import pandas as pd
+import pytest
+
+from row_schema import DOCUMENT_COLUMNS, RowSchema, SchemaError
+
+def _columns(*dropped):
+    return [column for column in DOCUMENT_COLUMNS if column not in dropped]
+
+def test_missing_columns_are_known_up_front():
+    schema = RowSchema(_columns('Flatness', 'p2_Chip ID') + ['Extra'])
+    assert schema.missing == ['Flatness', 'p2_Chip ID']
+    [record] = schema.records(pd.DataFrame([dict.fromkeys(schema.columns, 'x')]))
+    assert (record.flatness, record.p2_chip_id, record.comments) == ('', '', 'x')
+
+@pytest.mark.parametrize('required', ['ID', 'filename+ID'])
+def test_missing_required_column_lists_every_missing_column(required):
+    with pytest.raises(SchemaError) as error:
+        RowSchema(_columns(required, 'Flatness', 'Comments'))
+    message = str(error.value)
+    assert message.startswith(f"missing required columns: {required}")
+    assert 'Flatness' in message and 'Comments' in message
+
+def test_nan_and_none_read_as_empty_strings():
+    schema = RowSchema(_columns())
+    df = pd.DataFrame([dict.fromkeys(DOCUMENT_COLUMNS, None)])
+    df['ID'] = [float('nan')]
+    df['Flatness'] = [0.5]
+    [record] = schema.records(df)
+    assert record.cern_id == '' and record.user == ''
+    assert record.flatness == '0.5'
+
+def test_generator_reports_missing_columns_before_building(make_generator):
+    generator = make_generator(boards=2)
+    df = pd.read_csv(generator.csv, header=None, dtype=str)
+    header = list(df.iloc[2])
+    df = df.drop(columns=[header.index('Flatness'), header.index('p2_Connectors')])
+    df.to_csv(generator.csv, header=False, index=False)
+
+    generator.inst.stream = stream = io.StringIO()
+    generator._reload_records()
+    assert 'columns missing from V3-test.csv, left blank in the documents: Flatness, p2_Connectors' in stream.getvalue()
+    assert [row.flatness for row in generator.records] == ['', '']
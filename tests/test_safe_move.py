@@ -0,0 +1,46 @@
+import pytest
+
+import safe_move
+from benchmarks.fake_drive import FakeDriveService, FakeMedia
+from safe_move import SharedDriveMover
+
+BOARDS = [f'320XHF1TCV{i:05d}' for i in range(12)]
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """ the delays move_files waits between batch rounds, without waiting """
+    slept = []
+    monkeypatch.setattr(safe_move.time, 'sleep', slept.append)
+    return slept
+
+def _drive(**failures):
+    """ a fake drive holding one document per board in autoDoc/, and a mover for it """
+    service = FakeDriveService('HGCAL', **failures)
+    mover = SharedDriveMover(service=service, media_class=FakeMedia)
+    mover.upload_files([('autoDoc', f'QC_{board}.docx', b'docx') for board in BOARDS], 'HGCAL')
+    drive_id = mover._get_shared_drive_id('HGCAL')
+    for board in BOARDS:
+        mover._get_folder_id(f'autoDoc/{board}', drive_id, create=True)
+    pairs = [(f'autoDoc/QC_{board}.docx', f'autoDoc/{board}/QC_{board}.docx') for board in BOARDS]
+    return service, mover, pairs
+
+def test_throttled_calls_are_retried(sleeps):
+    service, mover, pairs = _drive(batch_fail_every=5)
+    results = mover.move_files(pairs, 'HGCAL', batch_size=4)
+    assert all(result['ok'] for result in results)
+    assert service.failures > 0
+    assert set(service.files_by_path()) == {target for _, target in pairs}
+
+def test_throttle_updates_once_per_round(sleeps):
+    """ two batches throttled in the same round double the delay once, not twice """
+    service, mover, pairs = _drive(throttle_batches=2)
+    results = mover.move_files(pairs, 'HGCAL', batch_size=3, max_workers=4)
+    assert all(result['ok'] for result in results)
+    assert service.calls['batch'] == 4 + 2 # a round of four batches, then a round for the two throttled ones
+    assert sleeps[0] == 0.0 and 1.0 <= sleeps[1] < 2.0
+
+def test_retries_run_out(sleeps):
+    service, mover, pairs = _drive(throttle_batches=100)
+    results = mover.move_files(pairs, 'HGCAL', batch_size=50, max_retries=2)
+    assert [result['error'] for result in results] == ['rate limited: retries exhausted'] * len(pairs)
+    assert service.calls['batch'] == 3
@@ -0,0 +1,13 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY = ('pandas', 'docx', 'google', 'googleapiclient', 'PIL')
+
+def test_cli_import_stays_light():
+    """ the bare import of cli (what --help needs) loads none of the heavy libraries """
+    probe = ("import sys, cli; "
+             f"print(' '.join(sorted({{m.split('.')[0] for m in sys.modules}} & set({HEAVY!r}))))")
+    output = subprocess.run([sys.executable, '-c', probe], cwd=ROOT, check=True, capture_output=True, text=True)
+    assert output.stdout.split() == []
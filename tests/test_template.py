@@ -0,0 +1,51 @@
+import io
+import zipfile
+
+from benchmarks.bench_template import _render
+
+def _package_xml(blob):
+    with zipfile.ZipFile(io.BytesIO(blob)) as z:
+        return z.read('word/document.xml'), z.read('word/styles.xml')
+
+def test_template_matches_builder(generator):
+    outputs = {}
+    for engine in ('builder', 'template'):
+        generator.engine = engine
+        outputs[engine] = [_package_xml(_render(generator, row)) for row in generator.records]
+    assert outputs['template'] == outputs['builder']
+
+def test_template_survives_pickling(generator):
+    """ pool workers receive the compiled template pickled with the generator """
+    import pickle
+    generator.engine = 'template'
+    row = generator.records[0]
+    expected = _package_xml(_render(generator, row))
+    clone = pickle.loads(pickle.dumps(generator))
+    assert _package_xml(_render(clone, row)) == expected
+
+def test_template_rows_do_not_share_images(generator):
+    """ rows copy the compiled package; pictures must land in the row's copy only """
+    def media(blob):
+        with zipfile.ZipFile(io.BytesIO(blob)) as z:
+            return sorted((name, z.read(name)) for name in z.namelist() if name.startswith('word/media/'))
+    generator.engine = 'builder'
+    expected = [media(_render(generator, row)) for row in generator.records]
+    generator.engine = 'template'
+    base = generator._get_template()._base_document()
+    parts = set(base.part.package.iter_parts())
+    assert [media(_render(generator, row)) for row in generator.records] == expected
+    assert set(base.part.package.iter_parts()) == parts
+
+def test_compact_template_matches_builder(generator):
+    """ compact output prunes styles.xml, which the template shares between plain rows """
+    generator.compact_level = 6
+    outputs = {}
+    for engine in ('builder', 'template', 'template'):
+        generator.engine = engine
+        blobs = []
+        for row in generator.records:
+            stream = io.BytesIO()
+            generator._create_quality_control_doc(row, stream=stream)
+            blobs.append(_package_xml(stream.getvalue()))
+        assert outputs.setdefault(engine, blobs) == blobs
+    assert outputs['template'] == outputs['builder']
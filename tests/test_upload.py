@@ -0,0 +1,37 @@
+import contextlib
+import csv
+import io
+import os
+import posixpath
+import zipfile
+
+import pytest
+
+from benchmarks.fake_drive import FakeDriveService, FakeMedia
+from safe_move import SharedDriveMover
+
+def _upload(generator, service, links, workers=1):
+    mover = SharedDriveMover(service=service, media_class=FakeMedia)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generator.create_documents_drive(workers=workers, shared_drive='HGCAL', upload_workers=4,
+                                                links=links, mover=mover)
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_documents_land_in_their_folders(make_generator, tmp_path, workers):
+    generator = make_generator(boards=6)
+    service = FakeDriveService('HGCAL', fail_every=5) # every 5th chunk is throttled and resumed
+    links = str(tmp_path / 'links.csv')
+    results = _upload(generator, service, links, workers)
+    assert [result['error'] for result in results] == [None] * len(generator.records)
+    assert service.failures > 0
+
+    files = service.files_by_path()
+    folder = generator.target_folder.replace(os.sep, '/')
+    for row in generator.records:
+        data = files[posixpath.join(folder, row.cern_id, row.doc_name + '.docx')]
+        assert zipfile.ZipFile(io.BytesIO(data)).testzip() is None
+
+    _upload(generator, service, links, workers)
+    assert len(service.files_by_path()) == len(files) # updated in place, no duplicates
+    with open(links, newline='', encoding='utf-8') as f:
+        assert sorted(entry['ID'] for entry in csv.DictReader(f)) == sorted(row.cern_id for row in generator.records)
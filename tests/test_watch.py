@@ -0,0 +1,51 @@
+import io
+import os
+import zipfile
+
+from PIL import Image as PILImage
+
+from benchmarks.bench_dir_index import count_calls
+from folder_watch import FolderWatch
+
+def _media(generator, row):
+    stream = io.BytesIO()
+    generator._create_quality_control_doc(row, stream=stream)
+    with zipfile.ZipFile(stream) as z:
+        return [z.read(name) for name in z.namelist() if name.startswith('word/media/')]
+
+def test_replaced_photo_is_rebuilt(generator, tmp_path):
+    row = generator.records[0]
+    path = os.path.join(generator.base, row.image_link)
+    _media(generator, row)
+    _media(generator, row) # asked for twice: the registry now holds the photo
+    held = generator.image_registry.stats()['images']
+
+    replacement = str(tmp_path / 'replacement.jpg')
+    PILImage.new('RGB', (64, 48), 'green').save(replacement, 'JPEG')
+    with open(replacement, 'rb') as f:
+        photo = f.read()
+    os.replace(replacement, path)
+
+    assert generator._affected_rows({row.image_link}) == [row]
+    assert generator.image_registry.stats()['images'] < held
+    assert photo in _media(generator, row)
+
+def test_poll_reads_only_changed_folders(tmp_path):
+    base = tmp_path / 'base'
+    for board in ('A', 'B'):
+        (base / board).mkdir(parents=True)
+        (base / board / 'photo.jpg').write_bytes(b'jpg')
+    watch = FolderWatch(str(base), debounce=0)
+
+    with count_calls({}) as counts:
+        assert watch.poll() == set()
+    assert counts['scandir'] == 1 # base only
+
+    (base / 'B' / 'late.jpg').write_bytes(b'jpg')
+    stat = os.stat(base / 'B') # a later mtime, even on coarse-grained clocks
+    os.utime(base / 'B', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    (base / 'sheet.csv').write_bytes(b'ID')
+    with count_calls({}) as counts:
+        assert watch.poll() == {'B/late.jpg', 'sheet.csv'}
+    assert counts['scandir'] == 2
+    assert watch.ready() and watch.take() == {'B/late.jpg', 'sheet.csv'}